@@ -1,8 +1,13 @@
 import pygame, os
-from enum import Enum, auto
+import argparse, json, tracemalloc
+import heapq, multiprocessing, signal
+from multiprocessing import shared_memory
+from array import array
+from enum import Enum, IntEnum, auto
+import numpy as np
+import random as _random
 from math import inf, sqrt, ceil
-from time import time
-from copy import deepcopy
+from time import time, perf_counter
 
 
 # Adjust the screen position
@@ -20,8 +25,6 @@ Border = 10
 TextHeight = 50
 TextBorder = 5
 
-Screen = pygame.display.set_mode((ScreenSize, ScreenSize + TextHeight))
-
 # Fonts
 pygame.font.init()
 DisplayFont = pygame.font.SysFont("couriernew", 50, bold=1)
@@ -29,6 +32,23 @@ DisplayFont = pygame.font.SysFont("couriernew", 50, bold=1)
 # Timing
 StageDelayTime = .1
 
+# Batch queries
+CORES = os.cpu_count()
+BatchChunkSize = 16 # Queries handed to a worker at a time
+
+# Hierarchical search
+ClusterSize = 16
+EntranceSplitLength = 6 # Entrances at least this long get a transition at both ends
+
+# Benchmarks
+BenchmarkSizes = (100, 500, 1000) # Everything up to 4000 works, it just takes a while
+ObstacleDensities = (.1, .2, .3) # One random maze family per density
+RoomSpacing = 16 # Each room gets a square this big to itself
+RoomSizes = (4, 12) # Smallest and largest room side
+LoopChance = .3 # Chance of a room linking to the one above it as well
+HeuristicWeight = 1.5 # For the weighted heuristic
+DepthFirstSizeLimit = 200 # Depth first search wanders most of the maze, so by default it skips bigger ones
+
 # Colors
 grey = lambda n: (n, n, n)
 White = grey(255)
@@ -37,19 +57,181 @@ Blue = (44, 44, 177)
 LightBlue = (203, 233, 246)
 Red = (177, 44, 44)
 Green = (44, 177, 44)
-
-class Tile(Enum):
+HeatNear = (250, 225, 110) # Flow field heatmap, from next to the end
+HeatFar = (70, 30, 110) # to the furthest reachable tile
+HeatSteps = 128 # Shades in between
+
+# The grid is drawn as indices into this, with the heatmap shades on the end
+Palette = [grey(100), grey(175), Green, Red, Blue, Blue, LightBlue]
+BorderIndex, ClearIndex, StartIndex, EndIndex, PathIndex, ClosedIndex, OpenedIndex = range(len(Palette))
+HeatIndex = len(Palette)
+Palette += [
+    tuple(round(near + (far - near) * step / (HeatSteps - 1)) for near, far in zip(HeatNear, HeatFar))
+    for step in range(HeatSteps)
+]
+
+# Search events, stored as index << 1 | kind with index = y * width + x
+Opened = 0
+Closed = 1
+
+class Tile(IntEnum):
     Wall = auto()
     Clear = auto()
     Start = auto()
     End = auto()
     Path = auto()
 
+# Palette index of every Tile value
+TileIndices = np.zeros(max(Tile) + 1, dtype=np.uint8)
+TileIndices[[Tile.Wall, Tile.Clear, Tile.Start, Tile.End, Tile.Path]] = \
+    [BorderIndex, ClearIndex, StartIndex, EndIndex, PathIndex]
+
 class Selection(Enum):
     Walls = auto()
     Start = auto()
     End = auto()
 
+# Bit k of a neighbor mask is set when the step Steps[k] can be taken
+Steps = [(dy, dx) for dy in (-1, 0, 1) for dx in (-1, 0, 1) if (dy, dx) != (0, 0)]
+
+class CompactGrid:
+    """
+    The grid as a uint8 array of Tile values
+    Next to it every cell has a byte with a bit per step that can be taken from it,
+    following the GetNeighbors rules, and the start and end are kept track of as they
+    are set. The searches read these directly, so there is nothing to rebuild per query
+
+    Only change cells through Set, it keeps the rest up to date.
+    grid[y][x] reads work like they did for the old list of lists
+
+    masks and walkable can be handed in already worked out for cells, as another
+    CompactGrid's, and are then used as they are without being rebuilt
+    """
+    def __init__(self, height, width, cells=None, masks=None, walkable=None):
+        self.height = height
+        self.width = width
+        if cells is None:
+            cells = np.full((height, width), Tile.Clear, dtype=np.uint8)
+        self.cells = cells
+
+        # Walkable cells with a ring of walls around them, so lookups need no bounds checks
+        self.paddedWidth = width + 2
+        if walkable is None:
+            walkable = np.pad(self.cells != Tile.Wall, 1).astype(np.uint8).reshape(-1)
+        self.walkable = walkable
+
+        # memoryviews index as fast as lists and give back plain ints
+        self.cellView = memoryview(self.cells.reshape(-1))
+        self.walkableView = memoryview(self.walkable)
+        self.rows = [self.cellView[y * width:(y + 1) * width] for y in range(height)]
+
+        # For every mask, the (flat offset, cost) of each step it allows
+        self.moves = [
+            tuple(
+                (dy * width + dx, sqrt(dy * dy + dx * dx))
+                for k, (dy, dx) in enumerate(Steps) if mask >> k & 1
+            )
+            for mask in range(256)
+        ]
+
+        found = np.argwhere(self.cells == Tile.Start)
+        self.startPoint = tuple(found[0].tolist()) if len(found) > 0 else (inf, inf)
+        found = np.argwhere(self.cells == Tile.End)
+        self.endPoint = tuple(found[0].tolist()) if len(found) > 0 else (inf, inf)
+
+        if masks is None:
+            self.masks = np.zeros(height * width, dtype=np.uint8)
+            self.UpdateMasks(0, 0, height, width)
+        else:
+            self.masks = masks
+        self.maskView = memoryview(self.masks)
+
+        # Flat indices of the cells Set has touched, only kept once someone makes it a set
+        self.changedCells = None
+
+    def __len__(self):
+        return self.height
+
+    def __getitem__(self, y):
+        return self.rows[y]
+
+    def Index(self, point):
+        return point[0] * self.width + point[1]
+
+    def UpdateMasks(self, top, left, bottom, right):
+        """
+        Recomputes the masks of the cells in [top, bottom) x [left, right)
+        """
+        top, left = max(top, 0), max(left, 0)
+        bottom, right = min(bottom, self.height), min(right, self.width)
+        if top >= bottom or left >= right:
+            return
+
+        # Walkable cells around the area, anything off the grid counts as a wall
+        walkable = np.zeros((bottom - top + 2, right - left + 2), dtype=bool)
+        y0, x0 = max(top - 1, 0), max(left - 1, 0)
+        y1, x1 = min(bottom + 1, self.height), min(right + 1, self.width)
+        walkable[y0 - top + 1:y1 - top + 1, x0 - left + 1:x1 - left + 1] = self.cells[y0:y1, x0:x1] != Tile.Wall
+
+        height = bottom - top
+        width = right - left
+        shifted = lambda dy, dx: walkable[1 + dy:1 + dy + height, 1 + dx:1 + dx + width]
+
+        masks = np.zeros((height, width), dtype=np.uint8)
+        for k, (dy, dx) in enumerate(Steps):
+            allowed = shifted(dy, dx)
+            if dy != 0 and dx != 0:
+                # A diagonal is only blocked when both corners are walls
+                allowed = allowed & (shifted(dy, 0) | shifted(0, dx))
+            masks |= allowed.astype(np.uint8) << k
+
+        self.masks.reshape(self.height, self.width)[top:bottom, left:right] = masks
+
+    def Set(self, y, x, tile):
+        old = self.cells[y, x]
+        self.cells[y, x] = tile
+        if self.changedCells is not None:
+            self.changedCells.add(y * self.width + x)
+
+        if old == Tile.Start and (y, x) == self.startPoint:
+            self.startPoint = (inf, inf)
+        if old == Tile.End and (y, x) == self.endPoint:
+            self.endPoint = (inf, inf)
+        if tile == Tile.Start:
+            self.startPoint = (y, x)
+        elif tile == Tile.End:
+            self.endPoint = (y, x)
+
+        if (old == Tile.Wall) != (tile == Tile.Wall):
+            self.walkable[(y + 1) * self.paddedWidth + x + 1] = tile != Tile.Wall
+            self.UpdateMasks(y - 1, x - 1, y + 2, x + 2)
+
+    def Clear(self):
+        self.cells[:] = Tile.Clear
+        if self.changedCells is not None:
+            self.changedCells.update(range(self.height * self.width))
+        self.walkable[:] = np.pad(np.ones((self.height, self.width), dtype=np.uint8), 1).reshape(-1)
+        self.startPoint = (inf, inf)
+        self.endPoint = (inf, inf)
+        self.UpdateMasks(0, 0, self.height, self.width)
+
+    def Walkable(self, y, x):
+        """
+        Works one cell past every edge, which counts as a wall
+        """
+        return self.walkableView[(y + 1) * self.paddedWidth + x + 1]
+
+def CompactGridFrom(grid):
+    """
+    A CompactGrid as is, or a list of lists of Tile converted into one
+    """
+    if isinstance(grid, CompactGrid):
+        return grid
+    height = len(grid)
+    width = len(grid[0]) if height > 0 else 0
+    cells = np.array([[int(tile) for tile in row] for row in grid], dtype=np.uint8).reshape(height, width)
+    return CompactGrid(height, width, cells)
+
 class SelectedButton:
     def __init__(self, msg, x, y, w, h, textBorder=TextBorder, textColor=Black, baseColor=grey(150), unselectedColor=Red, selectedColor=Green):
         self.x = x
@@ -202,109 +384,157 @@ class Button:
         return False
 
 class GridGenerator:
-    def __init__(self):
-        self.dimension = (ScreenSize - Border * 2) // TileSize
-        self.grid = [
-            [Tile.Clear for i in range(self.dimension)]
-            for j in range(self.dimension)
-        ]
+    def __init__(self, dimension=None):
+        """
+        Tiles shrink to fit when a dimension is given
+        """
+        self.tileSize = TileSize
+        if dimension is None:
+            dimension = (ScreenSize - Border * 2) // TileSize
+        else:
+            self.tileSize = max((ScreenSize - Border * 2) // dimension, 1)
+        self.dimension = dimension
+        self.grid = CompactGrid(self.dimension, self.dimension)
+        self.grid.changedCells = set()
 
         self.mouseDown = False
         self.lastMousePosition = (inf, inf)
         self.buttonTypeSelected = None
         self.placingWalls = False
 
-    def Draw(self, surface):
-        for y in range(self.dimension):
-            for x in range(self.dimension):
-                pygame.draw.rect(
-                    surface,
-                    grey(100),
-                    (
-                        x * TileSize + Border,
-                        y * TileSize + Border,
-                        TileSize,
-                        TileSize
-                    )
-                )
+        # Cached until the walls or the end change. flowEnd is the end as placed through
+        # SetTile, so painting over the End tile afterwards doesn't lose it
+        self.flowField = None
+        self.flowEnd = (inf, inf)
+        self.showFlowField = False
+
+        # Told about every wall change, when set
+        self.planner = None
+        self.hierarchy = HierarchicalPathfinder(self.grid)
+
+        # The grid is drawn through Palette into an 8 bit surface
+        # colors is the palette index each tile was last drawn with, 255 for not drawn yet,
+        # and overlay is the search DrawStage has drawn so far, 0 where there is nothing.
+        # Only the flat indices in dirty get their color worked out again, overlaid lists
+        # the tiles DrawStage has put something on
+        self.colors = np.full(dimension * dimension, 255, dtype=np.uint8)
+        self.overlay = np.zeros(dimension * dimension, dtype=np.uint8)
+        self.overlaid = []
+        self.dirty = set(range(dimension * dimension))
+        self.tileBorder = TileBorder if self.tileSize > 2 * TileBorder else 0
+        # Indexed [x, y] like pygame.surfarray
+        self.image = np.full((dimension * self.tileSize,) * 2, BorderIndex, dtype=np.uint8)
+        self.surface = pygame.Surface(self.image.shape, depth=8)
+        self.surface.set_palette(Palette)
+        # Heatmap shade of every tile, -1 for none, and the flow field it was worked out for
+        self.heat = np.full(dimension * dimension, -1, dtype=np.int16)
+        self.heatSource = None
+
+    def TileColors(self, indices):
+        """
+        Palette index of the tiles at the given flat indices
+        """
+        colors = TileIndices[self.grid.cells.reshape(-1)[indices]]
+        clear = colors == ClearIndex
 
-                color = grey(175)
-                if self.grid[y][x] == Tile.Wall:
-                    color = grey(100)
-                elif self.grid[y][x] == Tile.Start:
-                    color = Green
-                elif self.grid[y][x] == Tile.End:
-                    color = Red
-                elif self.grid[y][x]  == Tile.Path:
-                    color = Blue
-
-                pygame.draw.rect(
-                    surface,
-                    color,
-                    (
-                        x * TileSize + Border + TileBorder,
-                        y * TileSize + Border + TileBorder,
-                        TileSize - 2 * TileBorder,
-                        TileSize - 2 * TileBorder
-                    )
-                )
+        heat = self.heat[indices]
+        heated = clear & (heat >= 0)
+        colors[heated] = HeatIndex + heat[heated]
+        clear &= ~heated
 
-    def DrawStage(self, surface, stage):
-        for y in range(self.dimension):
-            for x in range(self.dimension):
-                pygame.draw.rect(
-                    surface,
-                    grey(100),
-                    (
-                        x * TileSize + Border,
-                        y * TileSize + Border,
-                        TileSize,
-                        TileSize
-                    )
-                )
+        overlay = self.overlay[indices]
+        searched = clear & (overlay != 0)
+        colors[searched] = overlay[searched]
+        return colors
 
-                color = grey(175)
-                if self.grid[y][x] == Tile.Wall:
-                    color = grey(100)
-                elif self.grid[y][x] == Tile.Start:
-                    color = Green
-                elif self.grid[y][x] == Tile.End:
-                    color = Red
-                elif self.grid[y][x]  == Tile.Path or \
-                    (y, x) in stage[1]:
-                    color = Blue
-                elif (y, x) in stage[0]:
-                    color = LightBlue
-
-                pygame.draw.rect(
-                    surface,
-                    color,
-                    (
-                        x * TileSize + Border + TileBorder,
-                        y * TileSize + Border + TileBorder,
-                        TileSize - 2 * TileBorder,
-                        TileSize - 2 * TileBorder
-                    )
-                )
+    def UpdateHeat(self):
+        """
+        Marks the tiles whose heatmap shade changed when the flow field shown did
+        """
+        source = self.flowField if self.showFlowField else None
+        if source is self.heatSource:
+            return
+        self.heatSource = source
+
+        heat = np.full(self.dimension * self.dimension, -1, dtype=np.int16)
+        if source is not None:
+            heat = source.HeatLevels(HeatSteps).reshape(-1)
+        self.dirty.update(np.flatnonzero(heat != self.heat).tolist())
+        self.heat = heat
+
+    def Render(self, surface):
+        """
+        Works the colors out again only for the tiles that could have changed since the
+        last frame, repaints the ones that did, then puts the whole grid on the surface
+        with one blit
+        """
+        self.UpdateHeat()
+        changed = self.grid.changedCells
+        if changed:
+            self.dirty.update(changed)
+            changed.clear()
+
+        if len(self.dirty) > 0:
+            indices = np.fromiter(self.dirty, dtype=np.int64, count=len(self.dirty))
+            self.dirty.clear()
+            colors = self.TileColors(indices)
+            repaint = colors != self.colors[indices]
+            indices, colors = indices[repaint], colors[repaint]
+
+            if len(indices) > 0:
+                self.colors[indices] = colors
+                ys, xs = np.divmod(indices, self.dimension)
+                inner = slice(self.tileBorder, self.tileSize - self.tileBorder)
+                tiles = self.image.reshape(self.dimension, self.tileSize, self.dimension, self.tileSize)
+                tiles[xs, inner, ys, inner] = colors[:, None, None]
+                pygame.surfarray.blit_array(self.surface, self.image)
+        surface.blit(self.surface, (Border, Border))
+
+    def Draw(self, surface):
+        for indices in self.overlaid:
+            self.overlay[indices] = 0
+            self.dirty.update(indices.tolist())
+        self.overlaid = []
+        self.Render(surface)
+
+    def DrawStage(self, surface, events):
+        """
+        Draws a batch of search events on top of what DrawStage drew before
+        Draw wipes them again
+        """
+        events = np.asarray(events, dtype=np.int64)
+        if len(events) > 0:
+            indices = events >> 1
+            kinds = np.where(events & 1 == Closed, ClosedIndex, OpenedIndex)
+            # Later events win, so only the last one for each tile counts
+            last = len(indices) - 1 - np.unique(indices[::-1], return_index=True)[1]
+            self.overlay[indices[last]] = kinds[last]
+            self.overlaid.append(indices[last])
+            self.dirty.update(indices[last].tolist())
+        self.Render(surface)
+
+    def FlowField(self):
+        """
+        The flow field to the end, only recomputed when something changed
+        """
+        if self.flowField is None:
+            self.flowField = FlowField(self.grid, self.flowEnd)
+        return self.flowField
 
     def GetStartPoint(self):
-        for y in range(len(self.grid)):
-            for x in range(len(self.grid[y])):
-                if self.grid[y][x] == Tile.Start:
-                    return (y, x)
-        return (inf, inf)
+        return self.grid.startPoint
 
     def GetEndPoint(self):
-        for y in range(len(self.grid)):
-            for x in range(len(self.grid[y])):
-                if self.grid[y][x] == Tile.End:
-                    return (y, x)
-        return (inf, inf)
+        return self.grid.endPoint
 
     def ClearWalls(self):
-        for y in range(self.dimension):
-            for x in range(self.dimension):
-                self.grid[y][x] = Tile.Clear
+        self.grid.Clear()
+
+        # The start and end went too, so there is nothing left to plan for
+        self.planner = None
+        self.flowField = None
+        self.flowEnd = (inf, inf)
+        self.hierarchy = HierarchicalPathfinder(self.grid)
 
     def SetStart(self, pos):
         """
@@ -315,33 +545,48 @@ class GridGenerator:
             pos[1] < Border or pos[1] > ScreenSize - 2 * Border:
             return 
             
-        for y in range(len(self.grid)):
-            for x in range(len(self.grid[y])):
-                if self.grid[y][x] == Tile.Start:
-                    self.grid[y][x] = Tile.Clear
+        y, x = self.grid.startPoint
+        if y != inf:
+            self.SetTile(y, x, Tile.Clear)
 
-                    # I could do this,
-                    # but its safer to leave it out to be safe
-                    # break
-
-        x = (pos[0] - Border) // TileSize
-        y = (pos[1] - Border) // TileSize
+        x = (pos[0] - Border) // self.tileSize
+        y = (pos[1] - Border) // self.tileSize
 
         
         if 0 > x or 0 > y or \
             x >= self.dimension or y >= self.dimension:
             return
 
-        self.grid[y][x] = Tile.Start
+        self.SetTile(y, x, Tile.Start)
+
+    def SetTile(self, y, x, tile):
+        """
+        Changes one tile, and lets everything built on the walls or the end know when they changed
+        """
+        wasWall = self.grid[y][x] == Tile.Wall
+        self.grid.Set(y, x, tile)
+        if tile == Tile.End:
+            self.flowEnd = (y, x)
+            self.flowField = None
+        elif (y, x) == self.flowEnd:
+            self.flowEnd = (inf, inf)
+            self.flowField = None
+        if wasWall == (tile == Tile.Wall):
+            return
+
+        if self.planner is not None:
+            self.planner.UpdateCell(y, x)
+        self.hierarchy.UpdateCell(y, x)
+        self.flowField = None
 
     def PlaceWall(self, y, x):
 
         if self.placingWalls:
-            if self.grid[y][x] == Tile.Clear:
-                self.grid[y][x] = Tile.Wall
+            if self.grid[y][x] == Tile.Clear or self.grid[y][x] == Tile.Path:
+                self.SetTile(y, x, Tile.Wall)
         else:
             if self.grid[y][x] == Tile.Wall:
-                self.grid[y][x] = Tile.Clear
+                self.SetTile(y, x, Tile.Clear)
 
     def SetWall(self, pos):
         distance = sqrt(
@@ -349,14 +594,14 @@ class GridGenerator:
             (pos[0] - self.lastMousePosition[0]) ** 2
         )
 
-        intermediateSteps = int(1 * (distance // TileSize)) + 1
+        intermediateSteps = int(1 * (distance // self.tileSize)) + 1
 
         dy = (-pos[1] + self.lastMousePosition[1]) / intermediateSteps
         dx = (-pos[0] + self.lastMousePosition[0]) / intermediateSteps
         for _ in range(intermediateSteps):
             try:
-                x = round((pos[0] - Border) / TileSize)
-                y = round((pos[1] - Border) / TileSize)
+                x = round((pos[0] - Border) / self.tileSize)
+                y = round((pos[1] - Border) / self.tileSize)
 
                 if 0 > x or 0 > y or \
                     x >= self.dimension or y >= self.dimension:
@@ -380,24 +625,19 @@ class GridGenerator:
             pos[1] < Border or pos[1] > ScreenSize - 2 * Border:
             return 
 
-        for y in range(len(self.grid)):
-            for x in range(len(self.grid[y])):
-                if self.grid[y][x] == Tile.End:
-                    self.grid[y][x] = Tile.Clear
+        y, x = self.grid.endPoint
+        if y != inf:
+            self.SetTile(y, x, Tile.Clear)
 
-                    # I could do this,
-                    # but its safer to leave it out to be safe
-                    # break
-
-        x = (pos[0] - Border) // TileSize
-        y = (pos[1] - Border) // TileSize
+        x = (pos[0] - Border) // self.tileSize
+        y = (pos[1] - Border) // self.tileSize
 
         
         if 0 > x or 0 > y or \
             x >= self.dimension or y >= self.dimension:
             return
 
-        self.grid[y][x] = Tile.End
+        self.SetTile(y, x, Tile.End)
 
     def SetTiles(self, pos):
         if self.buttonTypeSelected == Selection.Start:
@@ -413,8 +653,8 @@ class GridGenerator:
             self.lastMousePosition = event.pos
 
             # Determine if the current tile is a wall
-            y = (event.pos[1] - Border) // TileSize
-            x = (event.pos[0] - Border) // TileSize
+            y = (event.pos[1] - Border) // self.tileSize
+            x = (event.pos[0] - Border) // self.tileSize
         
             if 0 <= x < self.dimension and \
                 0 <= y < self.dimension and\
@@ -446,6 +686,17 @@ def Wait(seconds):
                 pygame.quit()
                 quit()
 
+def SearchStages(events):
+    """
+    Splits an event log into one batch per expanded node, like the old snapshots
+    A batch is the nodes opened by the previous expansion and the node closed next
+    """
+    first = 0
+    for i, event in enumerate(events):
+        if event & 1 == Closed:
+            yield events[first:i + 1]
+            first = i + 1
+
 def ReconstructPath(cameFrom, current):
     totalPath = [current]
     while current in cameFrom.keys():
@@ -459,37 +710,140 @@ def BasicHueristic(startPoint, endPoint):
         (startPoint[1] - endPoint[1]) ** 2
     )
 
+def OctileHueristic(startPoint, endPoint):
+    """
+    Diagonal steps then straight ones, the exact distance when nothing is in the way
+    """
+    dy = abs(startPoint[0] - endPoint[0])
+    dx = abs(startPoint[1] - endPoint[1])
+    return max(dy, dx) + (sqrt(2) - 1) * min(dy, dx)
+
+def WeightedHueristic(h, weight):
+    """
+    h scaled up. Fewer nodes get expanded, but paths can be up to weight times too long
+    """
+    return lambda startPoint, endPoint: weight * h(startPoint, endPoint)
+
+# Heuristics the benchmark can compare
+Heuristics = {
+    "euclidean": BasicHueristic,
+    "octile": OctileHueristic,
+    "weighted": WeightedHueristic(OctileHueristic, HeuristicWeight),
+}
+
+class SearchStats:
+    """
+    Counts what a search did, pass one in as stats to AStar, JumpPointSearch or DepthFirstSearch
+    Solvers only touch it when they are given one, so leaving it out costs nothing.
+    The counts and times add up over every search it is passed to
+
+    The heap functions and the heuristic are swapped for counting and timing versions,
+    and the times include that timing, so compare them with each other
+    rather than with runs without stats
+    """
+    def __init__(self):
+        self.expanded = 0
+        # Open nodes reached more cheaply again, each one leaves a stale heap entry behind
+        self.reopened = 0
+        self.pushes = 0
+        self.pops = 0
+        self.heuristicCalls = 0
+        self.seconds = 0
+        self.queueSeconds = 0
+        self.heuristicSeconds = 0
+        self.started = None
+
+    @property
+    def neighborSeconds(self):
+        """
+        Everything but the queue and the heuristic, which is mostly generating and relaxing neighbors
+        """
+        return self.seconds - self.queueSeconds - self.heuristicSeconds
+
+    def Wrap(self, push, pop, h):
+        """
+        Counting and timing versions of the heap functions and the heuristic
+        """
+        def Push(heap, item):
+            start = perf_counter()
+            push(heap, item)
+            self.queueSeconds += perf_counter() - start
+            self.pushes += 1
+
+        def Pop(heap):
+            start = perf_counter()
+            item = pop(heap)
+            self.queueSeconds += perf_counter() - start
+            self.pops += 1
+            return item
+
+        def Heuristic(startPoint, endPoint):
+            start = perf_counter()
+            distance = h(startPoint, endPoint)
+            self.heuristicSeconds += perf_counter() - start
+            self.heuristicCalls += 1
+            return distance
+
+        return Push, Pop, Heuristic
+
+    def Start(self):
+        self.started = perf_counter()
+
+    def Stop(self):
+        self.seconds += perf_counter() - self.started
+
+    def AsDict(self):
+        return {
+            "expanded": self.expanded,
+            "reopened": self.reopened,
+            "pushes": self.pushes,
+            "pops": self.pops,
+            "heuristicCalls": self.heuristicCalls,
+            "seconds": self.seconds,
+            "queueSeconds": self.queueSeconds,
+            "heuristicSeconds": self.heuristicSeconds,
+            "neighborSeconds": self.neighborSeconds,
+        }
+
 def GetNeighbors(node, grid):
     """
     For generating the neighbors of a node safely
     Babies first (real) generator
+    A CompactGrid already knows them, so that's just a lookup
     """
+    if isinstance(grid, CompactGrid):
+        index = grid.Index(node)
+        for offset, _ in grid.moves[grid.maskView[index]]:
+            yield divmod(index + offset, grid.width)
+        return
+
+    height = len(grid)
+    width = len(grid[0]) if height > 0 else 0
     for y in range(node[0] - 1, node[0] + 2):
         for x in range(node[1] - 1, node[1] + 2):
             # The node is not a neighobr of itself
             if (y, x) == node:
                 continue
-            if y < 0 or x < 0:
+            if y < 0 or x < 0 or y >= height or x >= width:
                 continue
 
-            # This is not the best, but it works so meh for now
-            try:
-                if grid[y][x] != Tile.Wall:
-                    if y != node[0] and x != node[1]:
-                        if grid[node[0]][x] == Tile.Wall and grid[y][node[1]] == Tile.Wall:
-                            continue
-                    yield (y, x)
-            except IndexError:
-                # Expected to happen on the edges
-                pass
-
-def DepthFirstSearch(grid, startPoint, endPoint, h=BasicHueristic):
+            if grid[y][x] != Tile.Wall:
+                if y != node[0] and x != node[1]:
+                    if grid[node[0]][x] == Tile.Wall and grid[y][node[1]] == Tile.Wall:
+                        continue
+                yield (y, x)
+
+def DepthFirstSearch(grid, startPoint, endPoint, h=BasicHueristic, recordEvents=True, stats=None):
     from random import choice
     """
     Goal is to simply return a path
     Not the best path, but a path
     For making sure that the system dealing with the result works fine
+    Returns (events, path) like the other solvers
     """
+    events = array('q')
+    grid = CompactGridFrom(grid)
+    width = grid.width
     
     # Change this to a min heap at some point
     openSet = set()
@@ -498,6 +852,8 @@ def DepthFirstSearch(grid, startPoint, endPoint, h=BasicHueristic):
     visitedSet = set()
 
     cameFrom = dict()
+    if stats is not None:
+        stats.Start()
 
     while len(openSet) > 0:
 
@@ -508,78 +864,1114 @@ def DepthFirstSearch(grid, startPoint, endPoint, h=BasicHueristic):
             break
 
         if current == endPoint:
-            return ReconstructPath(cameFrom, current)
+            if stats is not None:
+                stats.expanded += len(visitedSet)
+                stats.Stop()
+            return events, ReconstructPath(cameFrom, current)
 
         openSet.remove(current)
         visitedSet.add(current)
+        if recordEvents:
+            events.append((current[0] * width + current[1]) << 1 | Closed)
 
         for neighbor in GetNeighbors(current, grid):
             if neighbor not in openSet and neighbor not in visitedSet:
                 cameFrom[neighbor] = current
                 openSet.add(neighbor)
+                if recordEvents:
+                    events.append((neighbor[0] * width + neighbor[1]) << 1 | Opened)
 
+    if stats is not None:
+        stats.expanded += len(visitedSet)
+        stats.Stop()
     # This is a failure case
-    return []
+    return events, []
 
-def AStar(grid, startPoint, endPoint, h=BasicHueristic):
+def ReconstructIndexPath(cameFrom, current, width):
+    """
+    ReconstructPath for flat y * width + x indices, -1 marks the start
     """
-    Returns the optimal path between the start and end points
-    Return is a list of tuples:
+    totalPath = []
+    while current != -1:
+        totalPath.append(divmod(current, width))
+        current = cameFrom[current]
+    totalPath.reverse()
+    return totalPath
+
+def AStar(grid, startPoint, endPoint, h=BasicHueristic, recordEvents=True, stats=None):
+    """
+    Returns the search events and the optimal path between the start and end points
+    Path is a list of tuples:
         [(a, b), ... (c,d)]
+    and is empty if there is no path
+
+    The open set is a heap of (fScore, -gScore, index). Scores only ever go down,
+    so instead of updating entries a new one is pushed and the stale ones are skipped
+    when they come out. Scores and parents live in flat lists indexed by y * width + x
+
+    The events are an array('q') of index << 1 | Opened or Closed, in the order
+    they happened. Turn recordEvents off when nothing is going to draw them
+
+    Takes a CompactGrid, anything else is converted first
+    The moves out of a cell and their costs come straight from its mask
+    Pass a SearchStats as stats to see what the search did
     """
-    stages = []
-    # Change this to a min heap at some point
-    openSet = set()
-    visited = set()
-    openSet.add(startPoint)
+    events = array('q')
+    grid = CompactGridFrom(grid)
+    height = grid.height
+    width = grid.width
+    if not (0 <= startPoint[0] < height and 0 <= startPoint[1] < width and
+        0 <= endPoint[0] < height and 0 <= endPoint[1] < width):
+        return events, []
+
+    push, pop = heapq.heappush, heapq.heappop
+    if stats is not None:
+        push, pop, h = stats.Wrap(push, pop, h)
+        pushes = stats.pushes
+        stats.Start()
+
+    gScore = [inf] * (height * width)
+    cameFrom = [-1] * (height * width)
+    # 0 for unseen, then Opened + 1 or Closed + 1
+    state = bytearray(height * width)
+
+    start = startPoint[0] * width + startPoint[1]
+    end = endPoint[0] * width + endPoint[1]
+    gScore[start] = 0
+    state[start] = Opened + 1
+    openHeap = []
+    push(openHeap, (h(startPoint, endPoint), 0, start))
+    moves = grid.moves
+    masks = grid.maskView
+
+    path = []
+    while len(openHeap) > 0:
+        f, negativeG, current = pop(openHeap)
+        if state[current] == Closed + 1 or -negativeG > gScore[current]:
+            # Stale entry, the node was reached more cheaply since
+            continue
+
+        if current == end:
+            path = ReconstructIndexPath(cameFrom, current, width)
+            break
 
-    cameFrom = dict()
+        state[current] = Closed + 1
+        if recordEvents:
+            events.append(current << 1 | Closed)
+
+        for offset, cost in moves[masks[current]]:
+            index = current + offset
+            if state[index] == Closed + 1:
+                continue
+
+            tentativeGScore = gScore[current] + cost
+
+            if tentativeGScore < gScore[index]:
+                cameFrom[index] = current
+                gScore[index] = tentativeGScore
+                push(
+                    openHeap,
+                    (tentativeGScore + h(divmod(index, width), endPoint), -tentativeGScore, index)
+                )
+                if state[index] == 0:
+                    state[index] = Opened + 1
+                    if recordEvents:
+                        events.append(index << 1 | Opened)
+
+    if stats is not None:
+        stats.Stop()
+        stats.expanded += state.count(Closed + 1)
+        # Every push that didn't open a node for the first time
+        stats.reopened += stats.pushes - pushes - (len(state) - state.count(0))
+    # An empty path is a failure case
+    return events, path
+
+def JumpPointSearch(grid, startPoint, endPoint, h=BasicHueristic, recordEvents=True, stats=None):
+    """
+    A* that only expands jump points, same paths lengths for a fraction of the work
+    On a uniform grid most optimal paths are symmetric, so instead of expanding every
+    neighbor the search runs in a straight line until something forces a turn:
+    the goal, or a wall next to the line opening up a way that couldn't be
+    taken as cheaply any other way
+
+    Follows the same corner rule as GetNeighbors, a diagonal step is only
+    blocked when both of the orthogonal cells next to it are walls
+    Returns (events, path) like AStar, with events only for jump points
+    """
+    events = array('q')
+    grid = CompactGridFrom(grid)
+    height = grid.height
+    width = grid.width
+    if not (0 <= startPoint[0] < height and 0 <= startPoint[1] < width and
+        0 <= endPoint[0] < height and 0 <= endPoint[1] < width):
+        return events, []
+
+    # The grid keeps a ring of walls around the walkable cells, so the lookups need no bounds checks
+    paddedWidth = grid.paddedWidth
+    walkable = grid.walkableView
+
+    def Walkable(y, x):
+        return walkable[(y + 1) * paddedWidth + x + 1]
+
+    def Jump(y, x, dy, dx):
+        """
+        Steps from (y - dy, x - dx) into (y, x) and keeps going
+        Returns the first jump point on the way or None
+        """
+        while True:
+            if not Walkable(y, x):
+                return None
+            if (y, x) == endPoint:
+                return (y, x)
+
+            if dy != 0 and dx != 0:
+                if (Walkable(y + dy, x - dx) and not Walkable(y, x - dx)) or \
+                    (Walkable(y - dy, x + dx) and not Walkable(y - dy, x)):
+                    return (y, x)
+                # Anything the straight lines find has to be reached through here
+                if Jump(y, x + dx, 0, dx) is not None or Jump(y + dy, x, dy, 0) is not None:
+                    return (y, x)
+            elif dx != 0:
+                if (Walkable(y + 1, x + dx) and not Walkable(y + 1, x)) or \
+                    (Walkable(y - 1, x + dx) and not Walkable(y - 1, x)):
+                    return (y, x)
+            else:
+                if (Walkable(y + dy, x + 1) and not Walkable(y, x + 1)) or \
+                    (Walkable(y + dy, x - 1) and not Walkable(y, x - 1)):
+                    return (y, x)
+
+            # The next diagonal step is blocked by two walls
+            if not Walkable(y, x + dx) and not Walkable(y + dy, x):
+                return None
+            y += dy
+            x += dx
+
+    def PrunedNeighbors(y, x, parent):
+        """
+        Natural neighbors for the direction of travel plus any forced ones
+        """
+        if parent == -1:
+            yield from GetNeighbors((y, x), grid)
+            return
+
+        py, px = divmod(parent, width)
+        dy = (y > py) - (y < py)
+        dx = (x > px) - (x < px)
+
+        if dy != 0 and dx != 0:
+            vertical = Walkable(y + dy, x)
+            horizontal = Walkable(y, x + dx)
+            if vertical:
+                yield (y + dy, x)
+            if horizontal:
+                yield (y, x + dx)
+            if vertical or horizontal:
+                yield (y + dy, x + dx)
+            if not Walkable(y, x - dx) and vertical:
+                yield (y + dy, x - dx)
+            if not Walkable(y - dy, x) and horizontal:
+                yield (y - dy, x + dx)
+        elif dx != 0:
+            ahead = Walkable(y, x + dx)
+            if ahead:
+                yield (y, x + dx)
+                if not Walkable(y + 1, x):
+                    yield (y + 1, x + dx)
+                if not Walkable(y - 1, x):
+                    yield (y - 1, x + dx)
+        else:
+            ahead = Walkable(y + dy, x)
+            if ahead:
+                yield (y + dy, x)
+                if not Walkable(y, x + 1):
+                    yield (y + dy, x + 1)
+                if not Walkable(y, x - 1):
+                    yield (y + dy, x - 1)
+
+    push, pop = heapq.heappush, heapq.heappop
+    if stats is not None:
+        push, pop, h = stats.Wrap(push, pop, h)
+        pushes = stats.pushes
+        stats.Start()
 
-    # Better choice would be a default dict somehow, but im not too worried about this run time
     gScore = dict()
-    fScore = dict()
-    for y in range(len(grid)):
-        for x in range(len(grid[y])):
-            gScore[(y, x)] = inf
-            fScore[(y, x)] = inf
-    gScore[startPoint] = 0
-    fScore[startPoint] = h(startPoint, endPoint)
+    cameFrom = dict()
+    closed = set()
+
+    start = startPoint[0] * width + startPoint[1]
+    end = endPoint[0] * width + endPoint[1]
+    gScore[start] = 0
+    cameFrom[start] = -1
+    openHeap = []
+    push(openHeap, (h(startPoint, endPoint), 0, start))
+
+    path = []
+    while len(openHeap) > 0:
+        f, negativeG, current = pop(openHeap)
+        if current in closed or -negativeG > gScore[current]:
+            continue
+
+        if current == end:
+            path = ExpandJumpPath(ReconstructIndexPath(cameFrom, current, width))
+            break
 
-    while len(openSet) > 0:
-        # Determine the node with the minimum fScore
-        minFScore = inf
-        current = None
-        for node in openSet:
-            if fScore[node] <= minFScore:
-                minFScore = fScore[node]
-                current = node
+        closed.add(current)
+        if recordEvents:
+            events.append(current << 1 | Closed)
 
-        if current == endPoint:
-            return stages, ReconstructPath(cameFrom, current)
+        y, x = divmod(current, width)
+        for ny, nx in PrunedNeighbors(y, x, cameFrom[current]):
+            jumpPoint = Jump(ny, nx, ny - y, nx - x)
+            if jumpPoint is None:
+                continue
 
-        openSet.remove(current)
-        visited.add(current)
+            index = jumpPoint[0] * width + jumpPoint[1]
+            if index in closed:
+                continue
 
-        stages.append([deepcopy(openSet), deepcopy(visited)])
+            # Octile distance, the segment is diagonal then straight
+            distanceY = abs(jumpPoint[0] - y)
+            distanceX = abs(jumpPoint[1] - x)
+            tentativeGScore = gScore[current] + \
+                min(distanceY, distanceX) * sqrt(2) + abs(distanceY - distanceX)
+
+            if tentativeGScore < gScore.get(index, inf):
+                if recordEvents and index not in gScore:
+                    events.append(index << 1 | Opened)
+                cameFrom[index] = current
+                gScore[index] = tentativeGScore
+                push(
+                    openHeap,
+                    (tentativeGScore + h(jumpPoint, endPoint), -tentativeGScore, index)
+                )
 
-        for neighbor in GetNeighbors(current, grid):
-            # Im using the h function here
-            # Only works because h is currently the simple distance function
-            # Change to the distance function if need be
-            tentativeGScore = gScore[current] + h(current, neighbor)
+    if stats is not None:
+        stats.Stop()
+        stats.expanded += len(closed)
+        stats.reopened += stats.pushes - pushes - len(gScore)
+    # An empty path is a failure case
+    return events, path
 
-            if tentativeGScore < gScore[neighbor]:
-                cameFrom[neighbor] = current
-                gScore[neighbor] = tentativeGScore
-                fScore[neighbor] = gScore[neighbor] + h(neighbor, endPoint)
+def ExpandJumpPath(jumpPoints):
+    """
+    Fills in the cells between consecutive jump points
+    Every segment is a straight or diagonal line
+    """
+    if len(jumpPoints) == 0:
+        return []
+
+    path = [jumpPoints[0]]
+    for (y, x), (ny, nx) in zip(jumpPoints, jumpPoints[1:]):
+        dy = (ny > y) - (ny < y)
+        dx = (nx > x) - (nx < x)
+        while (y, x) != (ny, nx):
+            y += dy
+            x += dx
+            path.append((y, x))
+    return path
+
+def ExpansionCount(events):
+    """
+    Number of nodes a solver expanded
+    """
+    return sum(event & 1 == Closed for event in events)
 
-                if neighbor not in openSet:
-                    openSet.add(neighbor)
+def PathCost(path):
+    """
+    Length of a path, the same costs the solvers use
+    """
+    return sum(BasicHueristic(a, b) for a, b in zip(path, path[1:]))
 
-    # This is a failure case
-    return []
+class DStarLite:
+    """
+    Incremental planner that keeps its search between wall edits
+    Searches backwards from the end, so g is the cost to the end and stays valid
+    for everything an edit doesn't touch. After UpdateCell only the vertices
+    whose cost actually changed get expanded again by Plan
+
+    Reads the CompactGrid it was given live, so call UpdateCell after every edit.
+    MoveStart moves the start without throwing anything away
+    """
+    def __init__(self, grid, startPoint, endPoint, h=BasicHueristic):
+        self.grid = CompactGridFrom(grid)
+        self.height = self.grid.height
+        self.width = self.grid.width
+        self.h = h
+
+        self.startPoint = startPoint
+        self.endPoint = endPoint
+        # Added to every key instead of re-keying the queue when the start moves
+        self.km = 0
+
+        self.gScore = [inf] * (self.height * self.width)
+        self.rhs = [inf] * (self.height * self.width)
+
+        # Heap of (key, index), an entry only counts if queued still has its key
+        self.openHeap = []
+        self.queued = dict()
+
+        self.end = self.Index(endPoint)
+        self.rhs[self.end] = 0
+        self.Push(self.end)
+        # Whether Plan has anything to repair
+        self.changed = True
+
+    def Index(self, point):
+        return point[0] * self.width + point[1]
+
+    def Key(self, index):
+        point = divmod(index, self.width)
+        best = min(self.gScore[index], self.rhs[index])
+        return (best + self.h(self.startPoint, point) + self.km, best)
+
+    def Push(self, index):
+        key = self.Key(index)
+        self.queued[index] = key
+        heapq.heappush(self.openHeap, (key, index))
+
+    def TopKey(self):
+        while len(self.openHeap) > 0:
+            key, index = self.openHeap[0]
+            if self.queued.get(index) == key:
+                return key
+            heapq.heappop(self.openHeap)
+        return (inf, inf)
+
+    def Neighbors(self, index):
+        """
+        (index, cost) for every neighbor GetNeighbors would give, without the tuples
+        """
+        for offset, cost in self.grid.moves[self.grid.maskView[index]]:
+            yield index + offset, cost
+
+    def UpdateVertex(self, index):
+        if index != self.end:
+            if self.grid.cellView[index] == Tile.Wall:
+                self.rhs[index] = inf
+            else:
+                gScore = self.gScore
+                self.rhs[index] = min(
+                    (gScore[neighbor] + cost for neighbor, cost in self.Neighbors(index)),
+                    default=inf
+                )
+
+        self.Requeue(index)
+
+    def Requeue(self, index):
+        self.queued.pop(index, None)
+        if self.gScore[index] != self.rhs[index]:
+            self.Push(index)
+
+    def UpdateCell(self, y, x):
+        """
+        Call after (y, x) turned into or stopped being a wall
+        A cell also decides which diagonals around it are blocked,
+        so everything in the 3x3 around it might have changed
+        """
+        for ny in range(max(y - 1, 0), min(y + 2, self.height)):
+            for nx in range(max(x - 1, 0), min(x + 2, self.width)):
+                self.UpdateVertex(ny * self.width + nx)
+        self.changed = True
+
+    def MoveStart(self, startPoint):
+        self.km += self.h(self.startPoint, startPoint)
+        self.startPoint = startPoint
+        self.changed = True
+
+    def Plan(self, recordEvents=True):
+        """
+        Repairs the search and returns (events, path) like the other solvers
+        The events only cover the vertices this call had to expand
+        """
+        events = array('q')
+        start = self.Index(self.startPoint)
+        self.changed = False
+
+        while self.TopKey() < self.Key(start) or self.rhs[start] != self.gScore[start]:
+            oldKey, index = heapq.heappop(self.openHeap)
+            del self.queued[index]
+            if recordEvents:
+                events.append(index << 1 | Closed)
+
+            if oldKey < self.Key(index):
+                self.Push(index)
+            elif self.gScore[index] > self.rhs[index]:
+                # Got cheaper, the neighbors can only get cheaper through it
+                gScore = self.gScore[index] = self.rhs[index]
+                for neighbor, cost in self.Neighbors(index):
+                    if neighbor != self.end and gScore + cost < self.rhs[neighbor]:
+                        self.rhs[neighbor] = gScore + cost
+                        self.Requeue(neighbor)
+            else:
+                # Got more expensive, only the neighbors that went through it need a new rhs
+                oldGScore = self.gScore[index]
+                self.gScore[index] = inf
+                for neighbor, cost in list(self.Neighbors(index)):
+                    if self.rhs[neighbor] == oldGScore + cost:
+                        self.UpdateVertex(neighbor)
+                self.UpdateVertex(index)
+
+        return events, self.Path()
+
+    def Path(self):
+        """
+        Follows the cheapest successor from the start to the end
+        """
+        if self.gScore[self.Index(self.startPoint)] == inf:
+            return []
+
+        current = self.Index(self.startPoint)
+        path = [self.startPoint]
+        while current != self.end and len(path) <= self.height * self.width:
+            current = min(
+                self.Neighbors(current),
+                key=lambda step: self.gScore[step[0]] + step[1]
+            )[0]
+            path.append(divmod(current, self.width))
+        return path
+
+class HierarchicalPathfinder:
+    """
+    HPA*, near optimal paths on big grids without searching every cell
+    The grid is cut into ClusterSize squares. Where two clusters touch, every run
+    of open cells on both sides of the border is an entrance, with a transition in
+    the middle or, for long ones, at both ends. Searches run on the graph of
+    transitions, whose edges inside a cluster are the cluster local distances,
+    and the result is refined back into cells one cluster at a time
+
+    Clusters and borders are only worked out the first time a search needs them
+    and are forgotten when UpdateCell says they changed, so edits stay cheap
+    """
+    def __init__(self, grid, clusterSize=ClusterSize, h=BasicHueristic):
+        self.grid = CompactGridFrom(grid)
+        self.height = self.grid.height
+        self.width = self.grid.width
+        self.clusterSize = clusterSize
+        self.h = h
+
+        # (clusterY, clusterX) -> {node: [(node, cost), ...]}
+        self.clusters = dict()
+        # (clusterY, clusterX, dy, dx) -> [(node, node), ...] with the first node on the (clusterY, clusterX) side
+        self.borders = dict()
+
+    def ClusterOf(self, index):
+        y, x = divmod(index, self.width)
+        return (y // self.clusterSize, x // self.clusterSize)
+
+    def Bounds(self, cluster):
+        top = cluster[0] * self.clusterSize
+        left = cluster[1] * self.clusterSize
+        return top, left, min(top + self.clusterSize, self.height), min(left + self.clusterSize, self.width)
+
+    def UpdateCell(self, y, x):
+        """
+        Call after (y, x) turned into or stopped being a wall
+        """
+        cluster = (y // self.clusterSize, x // self.clusterSize)
+        self.clusters.pop(cluster, None)
+
+        # A cell along a border also changes that border's entrances
+        top, left, bottom, right = self.Bounds(cluster)
+        for dy, dx in ((-1, 0), (1, 0), (0, -1), (0, 1)):
+            if (dy == -1 and y == top) or (dy == 1 and y == bottom - 1) or \
+                (dx == -1 and x == left) or (dx == 1 and x == right - 1):
+                other = (cluster[0] + dy, cluster[1] + dx)
+                self.clusters.pop(other, None)
+                self.borders.pop(self.BorderKey(cluster, dy, dx), None)
+
+    def BorderKey(self, cluster, dy, dx):
+        # Each border is stored once, under the cluster above or left of it
+        if dy < 0 or dx < 0:
+            return (cluster[0] + dy, cluster[1] + dx, -dy, -dx)
+        return (cluster[0], cluster[1], dy, dx)
+
+    def Transitions(self, key):
+        """
+        Pairs of cells that step across a border, worked out on first use
+        """
+        if key in self.borders:
+            return self.borders[key]
+
+        clusterY, clusterX, dy, dx = key
+        top, left, bottom, right = self.Bounds((clusterY, clusterX))
+        if dx == 1:
+            if right >= self.width:
+                cells = []
+            else:
+                cells = [((y, right - 1), (y, right)) for y in range(top, bottom)]
+        else:
+            if bottom >= self.height:
+                cells = []
+            else:
+                cells = [((bottom - 1, x), (bottom, x)) for x in range(left, right)]
+
+        transitions = []
+        run = []
+        # The None on the end closes the last run
+        for pair in cells + [None]:
+            if pair is not None and self.grid[pair[0][0]][pair[0][1]] != Tile.Wall and \
+                self.grid[pair[1][0]][pair[1][1]] != Tile.Wall:
+                run.append(pair)
+                continue
+            if len(run) >= EntranceSplitLength:
+                transitions += [run[0], run[-1]]
+            elif len(run) > 0:
+                transitions.append(run[len(run) // 2])
+            run = []
+
+        transitions = [
+            (a[0] * self.width + a[1], b[0] * self.width + b[1])
+            for a, b in transitions
+        ]
+        self.borders[key] = transitions
+        return transitions
+
+    def Moves(self, index, bounds):
+        """
+        (index, cost) for the moves from index that stay inside bounds
+        """
+        top, left, bottom, right = bounds
+        y, x = divmod(index, self.width)
+        moves = self.grid.moves[self.grid.maskView[index]]
+        if top < y < bottom - 1 and left < x < right - 1:
+            # Nothing can step out of the cluster from the inside
+            yield from ((index + offset, cost) for offset, cost in moves)
+            return
+
+        for offset, cost in moves:
+            ny, nx = divmod(index + offset, self.width)
+            if top <= ny < bottom and left <= nx < right:
+                yield index + offset, cost
+
+    def LocalGraph(self, cluster):
+        """
+        {index: [(index, cost), ...]} of every move inside the cluster
+        Worked out once when a cluster is built, since every transition in it gets searched from
+        """
+        bounds = top, left, bottom, right = self.Bounds(cluster)
+        return {
+            y * self.width + x: list(self.Moves(y * self.width + x, bounds))
+            for y in range(top, bottom) for x in range(left, right)
+            if self.grid[y][x] != Tile.Wall
+        }
+
+    def ClusterSearch(self, source, cluster, targets=None, graph=None):
+        """
+        Dijkstra from source that never leaves the cluster, stopping once every target is reached
+        With a single target it is A* instead
+        Returns (gScore, cameFrom) dicts of flat indices
+        """
+        bounds = self.Bounds(cluster)
+        if graph is None:
+            moves = lambda index: self.Moves(index, bounds)
+        else:
+            moves = graph.__getitem__
+        targetPoint = None
+        remaining = None
+        if targets is not None:
+            remaining = set(targets)
+            if len(remaining) == 1:
+                targetPoint = divmod(next(iter(remaining)), self.width)
+
+        gScore = {source: 0}
+        cameFrom = {source: -1}
+        closed = set()
+        openHeap = [(0, 0, source)]
+        while len(openHeap) > 0:
+            f, g, current = heapq.heappop(openHeap)
+            if current in closed:
+                continue
+            closed.add(current)
+            if remaining is not None:
+                remaining.discard(current)
+                if len(remaining) == 0:
+                    break
+
+            for neighbor, cost in moves(current):
+                tentativeGScore = g + cost
+                if tentativeGScore < gScore.get(neighbor, inf):
+                    gScore[neighbor] = tentativeGScore
+                    cameFrom[neighbor] = current
+                    f = tentativeGScore
+                    if targetPoint is not None:
+                        f += self.h(divmod(neighbor, self.width), targetPoint)
+                    heapq.heappush(openHeap, (f, tentativeGScore, neighbor))
+
+        return gScore, cameFrom
+
+    def Cluster(self, cluster):
+        """
+        The abstract graph around one cluster, {node: [(node, cost), ...]},
+        building it if it isn't cached
+        """
+        if cluster in self.clusters:
+            return self.clusters[cluster]
+
+        edges = dict()
+        inter = []
+        for dy, dx in ((-1, 0), (1, 0), (0, -1), (0, 1)):
+            key = self.BorderKey(cluster, dy, dx)
+            if key[0] < 0 or key[1] < 0:
+                continue
+            for a, b in self.Transitions(key):
+                mine, other = (a, b) if key[:2] == cluster else (b, a)
+                edges[mine] = []
+                inter.append((mine, other))
+
+        # Distances are symmetric, so each search only has to find the nodes after it
+        graph = self.LocalGraph(cluster)
+        nodes = list(edges)
+        for i, node in enumerate(nodes[:-1]):
+            gScore, _ = self.ClusterSearch(node, cluster, nodes[i + 1:], graph)
+            for other in nodes[i + 1:]:
+                if other in gScore:
+                    edges[node].append((other, gScore[other]))
+                    edges[other].append((node, gScore[other]))
+
+        for mine, other in inter:
+            # A single step across the border
+            edges[mine].append((other, BasicHueristic(divmod(mine, self.width), divmod(other, self.width))))
+
+        self.clusters[cluster] = edges
+        return edges
+
+    def Build(self):
+        """
+        Builds every cluster up front instead of on first use
+        """
+        for clusterY in range(ceil(self.height / self.clusterSize)):
+            for clusterX in range(ceil(self.width / self.clusterSize)):
+                self.Cluster((clusterY, clusterX))
 
-def Visualize():
+    def Search(self, startPoint, endPoint, recordEvents=True):
+        """
+        Returns (events, path) like the other solvers
+        The events are for the transitions the abstract search expanded
+        """
+        events = array('q')
+        if not (0 <= startPoint[0] < self.height and 0 <= startPoint[1] < self.width and
+            0 <= endPoint[0] < self.height and 0 <= endPoint[1] < self.width):
+            return events, []
+        # Nothing can step onto a wall, the other solvers agree
+        if self.grid[endPoint[0]][endPoint[1]] == Tile.Wall:
+            return events, []
+
+        start = startPoint[0] * self.width + startPoint[1]
+        end = endPoint[0] * self.width + endPoint[1]
+        startCluster = self.ClusterOf(start)
+        endCluster = self.ClusterOf(end)
+
+        # The start and end only join the abstract graph for this search
+        startScores, _ = self.ClusterSearch(start, startCluster)
+        startEdges = [
+            (node, startScores[node]) for node in self.Cluster(startCluster) if node in startScores
+        ]
+        if end in startScores:
+            startEdges.append((end, startScores[end]))
+        endScores, _ = self.ClusterSearch(end, endCluster)
+
+        gScore = {start: 0}
+        cameFrom = {start: -1}
+        closed = set()
+        openHeap = [(self.h(startPoint, endPoint), 0, start)]
+        while len(openHeap) > 0:
+            f, negativeG, current = heapq.heappop(openHeap)
+            if current in closed:
+                continue
+            if current == end:
+                break
+            closed.add(current)
+            if recordEvents:
+                events.append(current << 1 | Closed)
+
+            # The start and end can be transitions themselves
+            neighbors = self.Cluster(self.ClusterOf(current)).get(current, [])
+            if current == start:
+                neighbors = neighbors + startEdges
+            elif current in endScores:
+                neighbors = neighbors + [(end, endScores[current])]
+
+            for neighbor, cost in neighbors:
+                tentativeGScore = gScore[current] + cost
+                if tentativeGScore < gScore.get(neighbor, inf):
+                    if recordEvents and neighbor not in gScore:
+                        events.append(neighbor << 1 | Opened)
+                    gScore[neighbor] = tentativeGScore
+                    cameFrom[neighbor] = current
+                    heapq.heappush(openHeap, (
+                        tentativeGScore + self.h(divmod(neighbor, self.width), endPoint),
+                        -tentativeGScore,
+                        neighbor
+                    ))
+
+        if end not in cameFrom:
+            return events, []
+
+        return events, self.Refine(ReconstructIndexPath(cameFrom, end, self.width))
+
+    def Refine(self, abstractPath):
+        """
+        Turns consecutive transitions back into cells
+        """
+        path = [abstractPath[0]]
+        for a, b in zip(abstractPath, abstractPath[1:]):
+            first = a[0] * self.width + a[1]
+            second = b[0] * self.width + b[1]
+            cluster = self.ClusterOf(first)
+            if cluster != self.ClusterOf(second):
+                # Stepping across a border
+                path.append(b)
+                continue
+
+            _, cameFrom = self.ClusterSearch(first, cluster, [second])
+            path += ReconstructIndexPath(cameFrom, second, self.width)[1:]
+        return path
+
+class FlowField:
+    """
+    Distance to the end from every tile, so any number of agents can head there
+    One Dijkstra out from the end fills in the distances, then every tile gets
+    pointed at its cheapest neighbor. After that an agent's next step is a lookup
+
+    The costs are 1 and sqrt(2), not whole numbers, so it is a heap rather than buckets
+    """
+    def __init__(self, grid, endPoint, h=BasicHueristic):
+        self.grid = grid = CompactGridFrom(grid)
+        self.h = h
+        self.height = grid.height
+        self.width = grid.width
+        self.endPoint = endPoint
+
+        self.distances = [inf] * (self.height * self.width)
+        # Flat index of the next tile on the way to the end, -1 for the end and unreachable tiles
+        self.nextStep = [-1] * (self.height * self.width)
+        self.maxDistance = 0
+
+        if not (0 <= endPoint[0] < self.height and 0 <= endPoint[1] < self.width) or \
+            grid[endPoint[0]][endPoint[1]] == Tile.Wall:
+            return
+
+        distances = self.distances
+        moves = grid.moves
+        masks = grid.maskView
+        end = endPoint[0] * self.width + endPoint[1]
+        distances[end] = 0
+        openHeap = [(0, end)]
+        while len(openHeap) > 0:
+            distance, index = heapq.heappop(openHeap)
+            if distance > distances[index]:
+                continue
+            self.maxDistance = distance
+
+            for offset, cost in moves[masks[index]]:
+                neighbor = index + offset
+                if distance + cost < distances[neighbor]:
+                    distances[neighbor] = distance + cost
+                    # Moves are symmetric, so the way back from the neighbor is through here
+                    self.nextStep[neighbor] = index
+                    heapq.heappush(openHeap, (distance + cost, neighbor))
+
+    def Distance(self, point):
+        return self.distances[point[0] * self.width + point[1]]
+
+    def NextStep(self, point):
+        """
+        Where to go from point, None at the end or when the end can't be reached
+        """
+        step = self.nextStep[point[0] * self.width + point[1]]
+        return None if step == -1 else divmod(step, self.width)
+
+    def Path(self, startPoint):
+        """
+        Same shape of result as the solvers' paths, empty if there is no way to the end
+        """
+        if not (0 <= startPoint[0] < self.height and 0 <= startPoint[1] < self.width):
+            return []
+
+        path = [startPoint]
+        step = self.NextStep(startPoint)
+        if self.Distance(startPoint) == inf:
+            # The other solvers let a path start on a wall, so step off it the cheapest way
+            step = min(
+                GetNeighbors(startPoint, self.grid),
+                key=lambda neighbor: self.h(startPoint, neighbor) + self.Distance(neighbor),
+                default=None
+            )
+            if step is None or self.Distance(step) == inf:
+                return []
+        while step is not None:
+            path.append(step)
+            step = self.NextStep(step)
+        return path
+
+    def HeatLevels(self, levels):
+        """
+        Every tile's distance scaled to 0 to levels - 1, -1 where the end can't be reached
+        """
+        distances = np.array(self.distances).reshape(self.height, self.width)
+        reachable = distances != inf
+        scale = (levels - 1) / self.maxDistance if self.maxDistance > 0 else 0
+        return np.where(reachable, np.round(np.where(reachable, distances, 0) * scale), -1).astype(np.int16)
+
+# Number keys pick the solver
+Solvers = {
+    pygame.K_1: ("A*", AStar),
+    pygame.K_2: ("Jump Point Search", JumpPointSearch),
+    pygame.K_3: ("Depth First Search", DepthFirstSearch),
+    # Keeps its clusters on the GridGenerator, see Visualize
+    pygame.K_4: ("HPA*", HierarchicalPathfinder),
+    # Cached on the GridGenerator as well, and drawn as a heatmap
+    pygame.K_5: ("Flow field", FlowField),
+}
+
+# Each pool worker's grid, read straight out of the shared memory
+_batchMemory = None
+_batchGrid = None
+_batchSolver = None
+
+def _BatchBuffers(buffer, height, width):
+    """
+    The cells, masks and walkable arrays of a grid, laid out one after another in buffer
+    """
+    size = height * width
+    paddedSize = (height + 2) * (width + 2)
+    cells = np.ndarray((height, width), dtype=np.uint8, buffer=buffer)
+    masks = np.ndarray(size, dtype=np.uint8, buffer=buffer, offset=size)
+    walkable = np.ndarray(paddedSize, dtype=np.uint8, buffer=buffer, offset=2 * size)
+    return cells, masks, walkable
+
+def _BatchSearch(grid, solver):
+    """
+    A function taking (startPoint, endPoint) and returning the path, for answering many queries on grid
+    """
+    if solver is HierarchicalPathfinder:
+        # Clusters built for one query are reused by the rest
+        search = HierarchicalPathfinder(grid).Search
+        return lambda startPoint, endPoint: search(startPoint, endPoint, recordEvents=False)[1]
+    if solver is FlowField:
+        # One field per end answers every query heading there
+        fields = {}
+        def Path(startPoint, endPoint):
+            endPoint = tuple(endPoint)
+            if endPoint not in fields:
+                fields[endPoint] = FlowField(grid, endPoint)
+            return fields[endPoint].Path(startPoint)
+        return Path
+    return lambda startPoint, endPoint: solver(grid, startPoint, endPoint, recordEvents=False)[1]
+
+def _BatchWorkerInit(memoryName, height, width, solver):
+    global _batchMemory, _batchGrid, _batchSolver
+    # pygame is set up on import and SDL turns SIGTERM into a quit event,
+    # which would stop Pool.terminate from ending workers
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+    # Kept open for as long as the worker lives, nothing is copied out of it or rebuilt
+    _batchMemory = shared_memory.SharedMemory(memoryName)
+    _batchGrid = CompactGrid(height, width, *_BatchBuffers(_batchMemory.buf, height, width))
+    _batchSolver = _BatchSearch(_batchGrid, solver)
+
+def _BatchQuery(pair):
+    return _batchSolver(pair[0], pair[1])
+
+def BatchPaths(grid, pairs, solver=AStar, processes=CORES, chunkSize=BatchChunkSize):
+    """
+    Paths for a list of (startPoint, endPoint) pairs on the same grid, in the same order
+    The cells, neighbor masks and walkable array go into shared memory once, every worker
+    wraps them in a CompactGrid when it starts without copying or rebuilding any of them,
+    and after that only the pairs and paths are sent back and forth
+    solver is any of the solvers, HierarchicalPathfinder and FlowField included
+    """
+    grid = CompactGridFrom(grid)
+    height = grid.height
+    width = grid.width
+    if processes <= 1 or len(pairs) <= chunkSize:
+        search = _BatchSearch(grid, solver)
+        return [search(start, end) for start, end in pairs]
+
+    memory = shared_memory.SharedMemory(create=True, size=2 * height * width + (height + 2) * (width + 2))
+    try:
+        cells, masks, walkable = _BatchBuffers(memory.buf, height, width)
+        cells[:] = grid.cells
+        masks[:] = grid.masks
+        walkable[:] = grid.walkable
+        del cells, masks, walkable # The memory can't be closed while they still point into it
+
+        with multiprocessing.Pool(processes, _BatchWorkerInit, (memory.name, height, width, solver)) as pool:
+            return pool.map(_BatchQuery, pairs, chunkSize)
+    finally:
+        memory.close()
+        memory.unlink()
+
+def Solve(solver, grid, startPoint, endPoint, recordEvents=True, h=BasicHueristic, stats=None):
+    """
+    Runs any of the Solvers on its own and returns (events, path)
+    HPA* and the flow field build everything they need from scratch,
+    the flow field doesn't report any events and has no use for h,
+    and neither of them fills in stats
+    """
+    if solver is HierarchicalPathfinder:
+        return HierarchicalPathfinder(grid, h=h).Search(startPoint, endPoint, recordEvents)
+    if solver is FlowField:
+        return array('q'), FlowField(grid, endPoint).Path(startPoint)
+    return solver(grid, startPoint, endPoint, h, recordEvents, stats)
+
+def OpenMaze(size, seed=0):
+    """
+    Nothing in the way, from corner to corner
+    All the maze families return (grid, startPoint, endPoint) and are the same for the same seed
+    """
+    return CompactGrid(size, size), (0, 0), (size - 1, size - 1)
+
+def RandomMaze(size, seed=0, density=.2):
+    """
+    Walls scattered at random, the corners are kept clear but might still be cut off
+    """
+    cells = np.where(
+        np.random.default_rng(seed).random((size, size)) < density, Tile.Wall, Tile.Clear
+    ).astype(np.uint8)
+    cells[:2, :2] = cells[-2:, -2:] = Tile.Clear
+    return CompactGrid(size, size, cells), (0, 0), (size - 1, size - 1)
+
+def DivisionMaze(size, seed=0):
+    """
+    Recursive division, every chamber is split by a wall with one gap in it
+    until the passages are a tile wide. There is exactly one way between any two tiles
+    """
+    rng = _random.Random(seed)
+    cells = np.full((size, size), Tile.Clear, dtype=np.uint8)
+
+    # Walls go on odd rows and columns and their gaps on even ones,
+    # so a later wall can never block an earlier gap
+    chambers = [(0, 0, size - 1, size - 1)]
+    while len(chambers) > 0:
+        top, left, bottom, right = chambers.pop()
+        height = bottom - top
+        width = right - left
+        if height < 2 and width < 2:
+            continue
+
+        if width < 2 or (height >= 2 and (height > width or (height == width and rng.random() < .5))):
+            y = top + 1 + 2 * rng.randrange(height // 2)
+            cells[y, left:right + 1] = Tile.Wall
+            cells[y, left + 2 * rng.randrange(width // 2 + 1)] = Tile.Clear
+            chambers += [(top, left, y - 1, right), (y + 1, left, bottom, right)]
+        else:
+            x = left + 1 + 2 * rng.randrange(width // 2)
+            cells[top:bottom + 1, x] = Tile.Wall
+            cells[top + 2 * rng.randrange(height // 2 + 1), x] = Tile.Clear
+            chambers += [(top, left, bottom, x - 1), (top, x + 1, bottom, right)]
+
+    return CompactGrid(size, size, cells), (0, 0), (size - 1, size - 1)
+
+def RoomsMaze(size, seed=0):
+    """
+    Rooms on a jittered lattice joined by one tile wide corridors
+    Every room links to the one left of it, the first column links up, and the rest
+    link up sometimes, so it's all connected with a few loops.
+    Goes from the first room to the last
+    """
+    rng = _random.Random(seed)
+    cells = np.full((size, size), Tile.Wall, dtype=np.uint8)
+
+    def Corridor(a, b):
+        cells[a[0], min(a[1], b[1]):max(a[1], b[1]) + 1] = Tile.Clear
+        cells[min(a[0], b[0]):max(a[0], b[0]) + 1, b[1]] = Tile.Clear
+
+    spacing = min(RoomSpacing, size)
+    count = max(size // spacing, 1)
+    centers = []
+    for row in range(count):
+        centers.append([])
+        for column in range(count):
+            # Leave a tile between rooms in neighboring squares
+            largest = max(min(RoomSizes[1], spacing - 1), 1)
+            height = rng.randint(min(RoomSizes[0], largest), largest)
+            width = rng.randint(min(RoomSizes[0], largest), largest)
+            top = row * spacing + rng.randrange(spacing - height + 1)
+            left = column * spacing + rng.randrange(spacing - width + 1)
+            cells[top:top + height, left:left + width] = Tile.Clear
+
+            center = (top + height // 2, left + width // 2)
+            if column > 0:
+                Corridor(centers[row][column - 1], center)
+            if row > 0 and (column == 0 or rng.random() < LoopChance):
+                Corridor(centers[row - 1][column], center)
+            centers[row].append(center)
+
+    return CompactGrid(size, size, cells), centers[0][0], centers[-1][-1]
+
+MazeFamilies = {
+    "open": OpenMaze,
+    **{
+        f"random{round(density * 100)}": lambda size, seed=0, density=density: RandomMaze(size, seed, density)
+        for density in ObstacleDensities
+    },
+    "division": DivisionMaze,
+    "rooms": RoomsMaze,
+}
+
+def Benchmark(solver, grid, startPoint, endPoint, measureMemory=True, h=BasicHueristic):
+    """
+    Headless run of one solver on one maze
+    Timed without recording events, then run again for the expansions and SearchStats,
+    and once more under tracemalloc for the peak memory, so none of it slows the timed run
+    pathCost is None when there is no path, stats when the solver doesn't keep any
+    """
+    start = perf_counter()
+    _, path = Solve(solver, grid, startPoint, endPoint, False, h)
+    seconds = perf_counter() - start
+
+    stats = None
+    if solver not in (HierarchicalPathfinder, FlowField):
+        stats = SearchStats()
+    events, _ = Solve(solver, grid, startPoint, endPoint, True, h, stats)
+
+    peakMemory = None
+    if measureMemory:
+        tracemalloc.start()
+        Solve(solver, grid, startPoint, endPoint, True, h)
+        peakMemory = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    return {
+        "seconds": seconds,
+        "expanded": ExpansionCount(events),
+        "peakMemory": peakMemory,
+        "pathCost": PathCost(path) if len(path) > 0 else None,
+        "pathLength": len(path),
+        "stats": None if stats is None else stats.AsDict(),
+    }
+
+def RunBenchmarks(families=MazeFamilies, sizes=BenchmarkSizes, solvers=None, seed=0, measureMemory=True,
+    heuristics=("euclidean",)):
+    """
+    Benchmarks every solver with every heuristic on every family at every size,
+    yielding a result at a time. Each maze is only generated once for all of them
+    Unless solvers are named, depth first search only runs up to DepthFirstSizeLimit
+    """
+    defaultSolvers = solvers is None
+    if defaultSolvers:
+        solvers = [name for name, _ in Solvers.values()]
+    solverFunctions = {name: function for name, function in Solvers.values()}
+
+    for family in families:
+        for size in sizes:
+            grid, startPoint, endPoint = MazeFamilies[family](size, seed)
+            for name in solvers:
+                if defaultSolvers and solverFunctions[name] is DepthFirstSearch and size > DepthFirstSizeLimit:
+                    continue
+                for heuristic in heuristics:
+                    result = {"family": family, "size": size, "seed": seed, "solver": name, "heuristic": heuristic}
+                    result.update(Benchmark(
+                        solverFunctions[name], grid, startPoint, endPoint, measureMemory, Heuristics[heuristic]
+                    ))
+                    yield result
+
+def Visualize(solver=AStar):
+    """
+    Returns the solver that was picked, so the next run can keep it
+    """
+    Screen = pygame.display.set_mode((ScreenSize, ScreenSize + TextHeight))
     NumberOfButtons = 5
     grid = GridGenerator()
     wallSelectedButton = SelectedButton(
@@ -621,6 +2013,8 @@ def Visualize():
     selectedOperation = Selection.Start
     startSelectedButton.selected = True
     grid.buttonTypeSelected = Selection.Start
+    solverName = next(name for name, function in Solvers.values() if function == solver)
+    pygame.display.set_caption(f"{solverName} - 1 to 5 to switch")
     while True:
 
         #######################################
@@ -632,6 +2026,10 @@ def Visualize():
                 pygame.quit()
                 quit()
 
+            if event.type == pygame.KEYDOWN and event.key in Solvers:
+                solverName, solver = Solvers[event.key]
+                pygame.display.set_caption(f"{solverName} - 1 to 5 to switch")
+
             if wallSelectedButton.HandleEvent(event):
                 startSelectedButton.selected = False
                 endSelectedButton.selected = False
@@ -675,13 +2073,29 @@ def Visualize():
 
     
 
-    stages, path = AStar(grid.grid, grid.GetStartPoint(), grid.GetEndPoint())
-    for stage in stages:
+    startPoint = grid.GetStartPoint()
+    endPoint = grid.GetEndPoint()
+    if solver is HierarchicalPathfinder:
+        events, path = grid.hierarchy.Search(startPoint, endPoint)
+    elif solver is FlowField:
+        events, path = array('q'), grid.FlowField().Path(startPoint)
+        grid.showFlowField = True
+    else:
+        events, path = solver(grid.grid, startPoint, endPoint)
+    pygame.display.set_caption(f"{solverName} - {ExpansionCount(events)} nodes expanded")
+    for stage in SearchStages(events):
         grid.DrawStage(Screen, stage)
         pygame.display.update()
         Wait(StageDelayTime)
-    for y, x in path:
-        grid.grid[y][x] = Tile.Path
+    # The ends stay Start and End, so the grid keeps track of them
+    for y, x in path[1:-1]:
+        grid.grid.Set(y, x, Tile.Path)
+
+    # Walls can still be drawn, the path is repaired incrementally as they change
+    if startPoint != (inf, inf) and endPoint != (inf, inf):
+        grid.planner = DStarLite(grid.grid, startPoint, endPoint)
+        grid.planner.Plan(recordEvents=False)
+    grid.buttonTypeSelected = Selection.Walls
 
     quitting = False
     while True:
@@ -694,6 +2108,22 @@ def Visualize():
             if event.type == pygame.KEYDOWN and event.key == pygame.K_r:
                 quitting = True
 
+            if grid.planner is not None:
+                grid.HandleEvent(event)
+
+        if grid.planner is not None and grid.planner.changed:
+            for y, x in path:
+                if grid.grid[y][x] == Tile.Path:
+                    grid.grid.Set(y, x, Tile.Clear)
+            events, path = grid.planner.Plan()
+            for y, x in path[1:-1]:
+                grid.grid.Set(y, x, Tile.Path)
+            pygame.display.set_caption(f"D* Lite - {ExpansionCount(events)} nodes expanded to repair the path")
+
+        if grid.showFlowField:
+            # Walls changing throws the old one away
+            grid.FlowField()
+
         Screen.fill(grey(25))
         grid.Draw(Screen)
         pygame.display.update()
@@ -701,8 +2131,60 @@ def Visualize():
         if quitting:
             break
 
+    grid.planner = None
+    return solver
+
 
 if __name__ == "__main__":
-    while True:
-        Visualize()
+    parser = argparse.ArgumentParser(description="A* and friends on a grid")
+    parser.add_argument("--benchmark", action="store_true", help="Run headless on generated mazes and report")
+    parser.add_argument("--families", default=",".join(MazeFamilies),
+        help="Comma separated maze families: " + ", ".join(MazeFamilies))
+    parser.add_argument("--sizes", default=",".join(str(size) for size in BenchmarkSizes),
+        help="Comma separated maze sides")
+    parser.add_argument("--solvers",
+        help="Comma separated solvers, all of them by default with depth first search only up to "
+        f"size {DepthFirstSizeLimit}: " + ", ".join(name for name, _ in Solvers.values()))
+    parser.add_argument("--heuristics", default="euclidean",
+        help="Comma separated heuristics to compare: " + ", ".join(Heuristics))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-memory", action="store_true", help="Skip the tracemalloc run")
+    parser.add_argument("--json", action="store_true", help="Print one JSON object per run")
+    args = parser.parse_args()
+
+    if not args.benchmark:
+        solver = AStar
+        while True:
+            solver = Visualize(solver)
+
+    families = args.families.split(",")
+    solvers = None if args.solvers is None else args.solvers.split(",")
+    heuristics = args.heuristics.split(",")
+    for option, names, known in (
+        ("--families", families, list(MazeFamilies)),
+        ("--solvers", solvers or [], [name for name, _ in Solvers.values()]),
+        ("--heuristics", heuristics, list(Heuristics)),
+    ):
+        for name in names:
+            if name not in known:
+                parser.error(f"{option}: {name} is not one of " + ", ".join(known))
+    sizes = [int(size) for size in args.sizes.split(",")]
+
+    if not args.json:
+        print(
+            f"{'family':>10} {'size':>6} {'solver':>20} {'heuristic':>10} "
+            f"{'seconds':>9} {'expanded':>10} {'reopened':>9} {'peak':>10} {'cost':>10}"
+        )
+    for result in RunBenchmarks(families, sizes, solvers, args.seed, not args.no_memory, heuristics):
+        if args.json:
+            print(json.dumps(result), flush=True)
+        else:
+            memory = "n/a" if result["peakMemory"] is None else f"{result['peakMemory'] / 2 ** 20:.1f} MiB"
+            cost = "no path" if result["pathCost"] is None else f"{result['pathCost']:.1f}"
+            reopened = "n/a" if result["stats"] is None else result["stats"]["reopened"]
+            print(
+                f"{result['family']:>10} {result['size']:>6} {result['solver']:>20} {result['heuristic']:>10} "
+                f"{result['seconds']:9.3f} {result['expanded']:>10} {reopened:>9} {memory:>10} {cost:>10}",
+                flush=True
+            )
         
\ No newline at end of file
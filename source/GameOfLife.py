@@ -14,11 +14,19 @@ For example:
 """
 
 import pygame, sys, os
-from time import time
-from random import randint
+import argparse, csv, json, re, tracemalloc
+import mmap, multiprocessing, shutil, signal, tempfile, zlib
+import numba as nb
+import numpy as np
+from time import time, perf_counter
+import random as _random
+from random import random
+from collections import deque
 
 pygame.init()
 
+CORES = os.cpu_count()
+
 y = 50
 x = 25
 os.environ['SDL_VIDEO_WINDOW_POS'] = "%d,%d" % (x,y)
@@ -34,8 +42,6 @@ adjustedWidth = ScreenWidth + Border * (2 - 6)
 ButtonWidth = round(adjustedWidth * .45 / 3)
 SelectorWidth = round(adjustedWidth * .55 / 2)
 
-Screen = pygame.display.set_mode((ScreenWidth + Border * 2, ScreenHeight + Border * 3))
-
 # Colors
 def Grey(n):
     return (n, n, n)
@@ -43,6 +49,7 @@ White = Grey(255)
 Black = Grey(0)
 BackgroundColor = Grey(50)
 ForegroundColor = Grey(200)
+CellColors = np.array([ForegroundColor, BackgroundColor], dtype=np.uint8) # Indexed by cell state
 
 # Font
 pygame.font.init()
@@ -50,6 +57,30 @@ DisplayFont = pygame.font.SysFont("Arial", 50)
 
 # Timing
 TimePerStage = 1 # in seconds
+PauseOnCycle = True # Stop once the field repeats itself
+CycleHistory = 256 # Longest period that can be spotted
+CycleKeyCache = 1024 # Regions whose Zobrist keys are kept instead of being remade
+LeapExponent = 10 # 'f' jumps 2 ** LeapExponent generations
+
+# Rewinding
+HistoryKeyframes = 32 # Stepping back costs at most this many deltas
+HistoryMemory = 64 * 2 ** 20 # in bytes, older frames spill to a temporary file
+HistoryLength = 100000 # Generations kept, older ones are forgotten
+HistorySpill = 1024 * 2 ** 20 # in bytes, the temporary file forgets old frames past this
+
+# Sparse stepping
+SparseBlockSize = 16
+SparseDenseFraction = .25 # Above this fraction of active blocks a full step is cheaper
+
+# Unbounded universe
+ChunkSize = 64 # Needs to be a power of two for HashLife
+MaxCellSize = 40
+PanStep = 100 # in pixels
+
+# Slices of a chunk for each neighbor direction (-1, 0, 1)
+_EdgeSlices = {-1: slice(0, 1), 0: slice(None), 1: slice(-1, None)}
+_HaloSources = {-1: slice(ChunkSize - 1, ChunkSize), 0: slice(0, ChunkSize), 1: slice(0, 1)}
+_HaloTargets = {-1: slice(0, 1), 0: slice(1, ChunkSize + 1), 1: slice(ChunkSize + 1, ChunkSize + 2)}
 
 # Simple enumeration
 Alive = True
@@ -292,34 +323,62 @@ class Selector:
                 activeValues.add(i)
         return activeValues
 
+    def SetActiveValues(self, values):
+        for i, button in self.buttons.items():
+            button.state = i in values
+
 class Field:
     def __init__(self, rect):
         self.rect = rect
         self.tileWidth = self.rect.w // TileSize
         self.tileHeight = self.rect.h // TileSize
 
-        self.grid = [[Dead for _ in range(self.tileWidth)] for _ in range(self.tileHeight)]
+        # Each engine makes its own kind of empty grid, so the array backed ones never build the lists
+        self.Clear()
 
-    def Draw(self, surface):
-        for y, row in enumerate(self.grid):
-            for x, cell in enumerate(row):
-                if cell == Alive:
-                    cellColor = BackgroundColor
-                else:
-                    cellColor = ForegroundColor
+        # Cells are drawn one pixel each into cellSurface, then scaled up into canvas
+        # Only rows that differ from lastDrawn get redrawn. Made on the first Draw
+        # so headless fields never allocate them
+        self.cellSurface = None
+        self.canvas = None
+        self.lastDrawn = None
 
-                # Draw the actual cell
-                pygame.draw.rect(
-                    surface,
-                    cellColor,
-                    (
-                        x * TileSize + self.rect.x,
-                        y * TileSize + self.rect.y,
-                        TileSize,
-                        TileSize
-                    )
+        # Cells evaluated by the last Progress, every one of them here
+        self.activeCells = self.tileWidth * self.tileHeight
+
+        # Keys of the Regions the last Progress could have changed, None for all of them
+        self.changedRegions = None
+
+    def Draw(self, surface):
+        if self.cellSurface is None:
+            self.cellSurface = pygame.Surface((self.tileWidth, self.tileHeight), 0, 32)
+            self.canvas = pygame.Surface((self.tileWidth * TileSize, self.tileHeight * TileSize), 0, 32)
+            self.cellColors = np.array([self.cellSurface.map_rgb(color) for color in CellColors])
+
+        cells = self.GetCells()
+        if self.lastDrawn is None:
+            changedRows = np.arange(self.tileHeight)
+        else:
+            changedRows = np.flatnonzero((cells != self.lastDrawn).any(axis=1))
+        self.lastDrawn = cells
+
+        if len(changedRows) > 0:
+            # surfarray is indexed [x, y]
+            pixels = pygame.surfarray.pixels2d(self.cellSurface)
+            pixels[:, changedRows] = self.cellColors[cells[changedRows]].T
+            del pixels # Unlocks the surface
+
+            # Scale each run of consecutive changed rows in one go
+            runs = np.split(changedRows, np.flatnonzero(np.diff(changedRows) != 1) + 1)
+            for run in runs:
+                strip = self.cellSurface.subsurface((0, run[0], self.tileWidth, len(run)))
+                self.canvas.blit(
+                    pygame.transform.scale(strip, (self.tileWidth * TileSize, len(run) * TileSize)),
+                    (0, run[0] * TileSize)
                 )
-                
+
+        surface.blit(self.canvas, self.rect.topleft)
+
         pygame.draw.rect(
             surface,
             Black,
@@ -328,17 +387,53 @@ class Field:
         )
 
     def HandleEvent(self, event):
-        if event.type == pygame.MOUSEBUTTONDOWN:
+        # Only the left button edits, same as ChunkedField where the others pan and zoom
+        if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
             if self.rect.collidepoint(event.pos):
                 y = (event.pos[1] - self.rect.y) // TileSize
                 x = (event.pos[0] - self.rect.x) // TileSize
                 
-                self.grid[y][x] = Alive if self.grid[y][x] == Dead else Dead
+                self.Toggle(y, x)
+
+    def Toggle(self, y, x):
+        self.grid[y][x] = Alive if self.grid[y][x] == Dead else Dead
+
+    def GetCells(self):
+        """
+        Copy of the grid as a uint8 array, 1 for Alive
+        """
+        return np.array(self.grid, dtype=np.uint8)
+
+    def SetCells(self, cells):
+        self.grid = [[Alive if cell else Dead for cell in row] for row in cells]
 
-    def Randomize(self):
+    def Regions(self, keys=None):
+        """
+        (key, cells) for the parts of the field CycleDetector hashes separately,
+        only the ones in keys if given. cells is None for a part with nothing in it
+        """
+        return [((0, 0), self.GetCells())]
+
+    def Snapshot(self):
+        """
+        The whole field as a dict of equally sized uint8 blocks, what History records
+        """
+        return {(0, 0): self.GetCells()}
+
+    def Restore(self, blocks):
+        """
+        Put back a Snapshot, missing blocks are empty
+        """
+        cells = blocks.get((0, 0))
+        if cells is None:
+            self.Clear()
+        else:
+            self.SetCells(cells)
+
+    def Randomize(self, density=.5):
         for y in range(len(self.grid)):
             for x in range(len(self.grid[y])):
-                if randint(0, 1) == 0:
+                if random() >= density:
                     self.grid[y][x] = Dead
                 else:
                     self.grid[y][x] = Alive
@@ -346,6 +441,53 @@ class Field:
     def Clear(self):
         self.grid = [[Dead for _ in range(self.tileWidth)] for _ in range(self.tileHeight)]
 
+    def Leap(self, birthValues, deathValues, k):
+        """
+        Jump 2 ** k generations ahead with HashLife
+        HashLife runs on an unbounded plane, so unlike Progress the edges don't kill cells.
+        Anything that wanders outside the field is dropped when the result is written back
+        """
+        # With birth on 0 neighbors empty space comes alive, which HashLife can't shortcut,
+        # but on a bounded field it is well defined, so those rules just step one at a time
+        if 0 in birthValues:
+            for _ in range(1 << k):
+                self.Progress(birthValues, deathValues)
+            return
+
+        life = getattr(self, "hashLife", None)
+        if life is None or not life.SameRule(birthValues, deathValues):
+            # Keep the engine around so its node cache carries over between leaps
+            life = self.hashLife = HashLife(birthValues, deathValues)
+
+        life.Load(self.GetCells())
+        life.Advance(k)
+        self.SetCells(life.Window(0, 0, self.tileHeight, self.tileWidth))
+
+    def LoadPattern(self, path):
+        """
+        Reads an .rle or .mc (macrocell) file into the top left of the field
+        Returns the pattern's (birthValues, deathValues)
+        """
+        if path.endswith(".mc"):
+            life, birthValues, deathValues = ReadMacrocell(path)
+            self.SetCells(_PatternWindow(life, self.tileHeight, self.tileWidth))
+        else:
+            cells = np.zeros((self.tileHeight, self.tileWidth), dtype=np.uint8)
+            cells, birthValues, deathValues = ReadRLE(path, cells)
+            self.SetCells(cells)
+        return birthValues, deathValues
+
+    def SavePattern(self, path, birthValues, deathValues):
+        """
+        Writes the field as .mc (macrocell) if the path says so, otherwise as RLE
+        """
+        if path.endswith(".mc"):
+            life = HashLife(birthValues, deathValues)
+            life.Load(self.GetCells())
+            WriteMacrocell(path, life)
+        else:
+            WriteRLE(path, self.GetCells(), birthValues, deathValues)
+
     def Progress(self, birthValues, deathValues):
         """
         Simulate one round of the game
@@ -373,11 +515,1688 @@ class Field:
                         newGrid[y][x] = Dead
         self.grid = newGrid
 
-def Main():
+def RuleTable(birthValues, deathValues):
+    """
+    Lookup table for the next state of a cell
+    Indexed as table[currentState, aliveNeighborCount]
+    """
+    table = np.zeros((2, 9), dtype=np.uint8)
+    for i in range(9):
+        table[0, i] = i in birthValues
+        table[1, i] = i not in deathValues
+    return table
+
+def NeighborCounts(grid):
+    """
+    Number of alive neighbors for every cell of a uint8 grid
+    Cells past the edges count as dead, same as GetNeighbors
+    """
+    padded = np.zeros((grid.shape[0] + 2, grid.shape[1] + 2), dtype=np.uint8)
+    padded[1:-1, 1:-1] = grid
+
+    h, w = grid.shape
+    counts = np.zeros(grid.shape, dtype=np.uint8)
+    for dy in range(3):
+        for dx in range(3):
+            if dy == 1 and dx == 1:
+                continue
+            counts += padded[dy:dy + h, dx:dx + w]
+    return counts
+
+class NumpyField(Field):
+    """
+    Same as Field but the grid is a uint8 array
+    Indexing still works as grid[y][x] so Draw and HandleEvent are unchanged
+    """
+    def Randomize(self, density=.5):
+        self.grid = (np.random.random((self.tileHeight, self.tileWidth)) < density).astype(np.uint8)
+
+    def Clear(self):
+        self.grid = np.zeros((self.tileHeight, self.tileWidth), dtype=np.uint8)
+
+    def GetCells(self):
+        return self.grid.copy()
+
+    def SetCells(self, cells):
+        self.grid = np.array(cells, dtype=np.uint8)
+
+    def LoadPattern(self, path):
+        if path.endswith(".mc"):
+            return super().LoadPattern(path)
+
+        # RLE decodes straight into the grid
+        self.Clear()
+        _, birthValues, deathValues = ReadRLE(path, self.grid)
+        return birthValues, deathValues
+
+    def Progress(self, birthValues, deathValues):
+        """
+        Simulate one round of the game
+        """
+        table = RuleTable(birthValues, deathValues)
+        self.grid = table[self.grid, NeighborCounts(self.grid)]
+
+class SparseField(NumpyField):
+    """
+    Only re-evaluates blocks that changed last generation, plus the blocks around them
+    The grid is split into SparseBlockSize squares and a block is dirty if any cell in it changed.
+    activeCells is how many cells the last Progress actually evaluated
+    """
+    def __init__(self, rect):
+        self.blockHeight = -(-(rect.h // TileSize) // SparseBlockSize)
+        self.blockWidth = -(-(rect.w // TileSize) // SparseBlockSize)
+        self.activeCells = 0
+
+        # The dirty blocks only hold for the rule they were stepped with
+        self.rule = None
+        super().__init__(rect)
+
+    def _MarkAll(self):
+        self.dirty = np.ones((self.blockHeight, self.blockWidth), dtype=bool)
+        self.changedRegions = None
+
+    def Regions(self, keys=None):
+        """
+        One region per block
+        """
+        if keys is None:
+            keys = np.ndindex(self.blockHeight, self.blockWidth)
+        size = SparseBlockSize
+        return [((by, bx), self.grid[by * size:(by + 1) * size, bx * size:(bx + 1) * size]) for by, bx in keys]
+
+    def Randomize(self, density=.5):
+        super().Randomize(density)
+        self._MarkAll()
+
+    def Clear(self):
+        super().Clear()
+        self._MarkAll()
+
+    def SetCells(self, cells):
+        super().SetCells(cells)
+        self._MarkAll()
+
+    def Toggle(self, y, x):
+        super().Toggle(y, x)
+        self.dirty[y // SparseBlockSize, x // SparseBlockSize] = True
+
+    def _ChangedBlocks(self, oldGrid, newGrid):
+        size = SparseBlockSize
+        changed = np.zeros((self.blockHeight * size, self.blockWidth * size), dtype=bool)
+        changed[:self.tileHeight, :self.tileWidth] = oldGrid != newGrid
+        return changed.reshape(self.blockHeight, size, self.blockWidth, size).any(axis=(1, 3))
+
+    def Progress(self, birthValues, deathValues):
+        """
+        Simulate one round of the game
+        """
+        rule = (set(birthValues), set(deathValues))
+        if rule != self.rule:
+            self.rule = rule
+            self._MarkAll()
+
+        # A change can only spread one cell, so only blocks touching a dirty block can change
+        active = self.dirty.copy()
+        active[1:, :] |= self.dirty[:-1, :]
+        active[:-1, :] |= self.dirty[1:, :]
+        active[:, 1:] |= active[:, :-1].copy()
+        active[:, :-1] |= active[:, 1:].copy()
+
+        # With birth on 0 neighbors empty space changes too, so nothing can be skipped
+        if 0 in birthValues or np.count_nonzero(active) > active.size * SparseDenseFraction:
+            oldGrid = self.grid
+            super().Progress(birthValues, deathValues)
+            self.dirty = self._ChangedBlocks(oldGrid, self.grid)
+            self.changedRegions = list(zip(*np.nonzero(self.dirty)))
+            self.activeCells = self.grid.size
+            return
+
+        table = RuleTable(birthValues, deathValues)
+        size = SparseBlockSize
+        h, w = self.grid.shape
+
+        # Work everything out from the old grid before writing anything back
+        updates = []
+        self.activeCells = 0
+        for by, bx in zip(*np.nonzero(active)):
+            y0, x0 = by * size, bx * size
+            y1, x1 = min(y0 + size, h), min(x0 + size, w)
+
+            # Include a one cell halo so the counts at the block edges are right
+            hy0, hx0 = max(y0 - 1, 0), max(x0 - 1, 0)
+            region = self.grid[hy0:min(y1 + 1, h), hx0:min(x1 + 1, w)]
+            counts = NeighborCounts(region)[y0 - hy0:y1 - hy0, x0 - hx0:x1 - hx0]
+
+            block = self.grid[y0:y1, x0:x1]
+            updates.append((by, bx, block, table[block, counts]))
+            self.activeCells += block.size
+
+        self.dirty = np.zeros_like(self.dirty)
+        for by, bx, block, newBlock in updates:
+            if not np.array_equal(block, newBlock):
+                block[:] = newBlock
+                self.dirty[by, bx] = True
+        self.changedRegions = list(zip(*np.nonzero(self.dirty)))
+
+@nb.njit
+def _ColumnSum(grid, y, x, height):
+    """
+    Alive cells in column x from row y - 1 to y + 1
+    """
+    total = np.int32(grid[y, x])
+    if y > 0:
+        total += grid[y - 1, x]
+    if y < height - 1:
+        total += grid[y + 1, x]
+    return total
+
+@nb.njit(parallel=True)
+def _StepStripes(grid, newGrid, table, stripes):
+    """
+    One generation of grid into newGrid, split into horizontal stripes
+    Each stripe runs on its own thread and reads the row above and below it
+    from the shared grid as its halo
+    """
+    height, width = grid.shape
+    stripeHeight = (height + stripes - 1) // stripes
+
+    for stripe in nb.prange(stripes):
+        top = stripe * stripeHeight
+        bottom = min(top + stripeHeight, height)
+
+        for y in range(top, bottom):
+            # Rolling window over the vertical sums of three cells to the west, at, and east of x
+            # Each cell only adds the sum for the column east of it, the edges count as dead
+            west = np.int32(0)
+            here = _ColumnSum(grid, y, 0, height)
+            for x in range(width):
+                east = _ColumnSum(grid, y, x + 1, height) if x + 1 < width else np.int32(0)
+                count = west + here + east - grid[y, x]
+                newGrid[y, x] = table[grid[y, x], count]
+                west, here = here, east
+
+class ParallelField(NumpyField):
+    """
+    NumpyField stepped on every core, one horizontal stripe per thread
+    Uses the same lookup table, so the result matches NumpyField exactly
+    """
+    def __init__(self, rect, stripes=CORES):
+        self.stripes = stripes
+        super().__init__(rect)
+
+    def Progress(self, birthValues, deathValues):
+        """
+        Simulate one round of the game
+        """
+        table = RuleTable(birthValues, deathValues)
+        grid = np.ascontiguousarray(self.grid)
+        newGrid = np.empty_like(grid)
+        _StepStripes(grid, newGrid, table, min(self.stripes, self.tileHeight))
+        self.grid = newGrid
+
+def _FullAdder(a, b, c):
+    """
+    Adds three bit planes, returns (sum, carry)
+    """
+    partial = a ^ b
+    return partial ^ c, (a & b) | (partial & c)
+
+class PackedField(Field):
+    """
+    Bit-packed grid, 64 cells per uint64 word along each row
+    Bit i of word j in a row is the cell at x = j * 64 + i
+
+    Progress counts neighbors for 64 cells at a time with bit-parallel adders,
+    so any birth/death rule costs the same as Conway's
+    """
+    def __init__(self, rect):
+        self.wordCount = -(-(rect.w // TileSize) // 64)
+        super().__init__(rect)
+
+        # Bits past tileWidth in the last word have to stay dead
+        # or they would leak births into the edge column
+        self.lastWordMask = np.uint64((1 << (self.tileWidth - (self.wordCount - 1) * 64)) - 1)
+
+    @property
+    def grid(self):
+        # Unpacked on every access, fine for drawing but use words for anything heavy
+        return self.GetCells()
+
+    @grid.setter
+    def grid(self, cells):
+        self.SetCells(cells)
+
+    def GetCells(self):
+        bits = np.unpackbits(self.words.view(np.uint8), axis=1, bitorder="little")
+        return bits[:, :self.tileWidth]
+
+    def SetCells(self, cells):
+        padded = np.zeros((self.tileHeight, self.wordCount * 64), dtype=np.uint8)
+        padded[:, :self.tileWidth] = np.asarray(cells, dtype=np.uint8)
+        packed = np.packbits(padded, axis=1, bitorder="little")
+        self.words = np.ascontiguousarray(packed).view("<u8")
+
+    def Toggle(self, y, x):
+        self.words[y, x // 64] ^= np.uint64(1 << (x % 64))
+
+    def Randomize(self, density=.5):
+        self.SetCells(np.random.random((self.tileHeight, self.tileWidth)) < density)
+
+    def Clear(self):
+        self.words = np.zeros((self.tileHeight, self.wordCount), dtype="<u8")
+
+    def _Horizontal(self, rows):
+        """
+        Returns the planes holding each cell's west and east neighbor
+        """
+        zeroColumn = np.zeros((rows.shape[0], 1), dtype=rows.dtype)
+        previousWords = np.hstack((zeroColumn, rows[:, :-1]))
+        nextWords = np.hstack((rows[:, 1:], zeroColumn))
+
+        west = (rows << 1) | (previousWords >> 63)
+        east = (rows >> 1) | (nextWords << 63)
+        return west, east
+
+    def _RuleMask(self, countBits, values):
+        """
+        Plane of cells whose neighbor count is in values
+        """
+        mask = np.zeros_like(countBits[0])
+        for value in values:
+            if not 0 <= value <= 8:
+                continue
+            match = None
+            for i, bit in enumerate(countBits):
+                term = bit if value >> i & 1 else ~bit
+                match = term if match is None else match & term
+            mask |= match
+        return mask
+
+    def Progress(self, birthValues, deathValues):
+        """
+        Simulate one round of the game
+        """
+        words = self.words
+        zeroRow = np.zeros((1, self.wordCount), dtype=words.dtype)
+        north = np.vstack((zeroRow, words[:-1]))
+        south = np.vstack((words[1:], zeroRow))
+
+        northWest, northEast = self._Horizontal(north)
+        west, east = self._Horizontal(words)
+        southWest, southEast = self._Horizontal(south)
+
+        # Sum the 8 neighbor planes into a 4 bit count per cell
+        a, b = _FullAdder(northWest, north, northEast)
+        c, d = _FullAdder(west, east, southWest)
+        e, f = south ^ southEast, south & southEast
+
+        ones, g = _FullAdder(a, c, e)
+        h, fours = _FullAdder(b, d, f)
+        twos, i = h ^ g, h & g
+        fours, eights = fours ^ i, fours & i
+
+        countBits = (ones, twos, fours, eights)
+        birth = self._RuleMask(countBits, birthValues)
+        survive = self._RuleMask(countBits, set(range(9)) - set(deathValues))
+
+        newWords = (words & survive) | (~words & birth)
+        newWords[:, -1] &= self.lastWordMask
+        self.words = newWords
+
+class _LifeNode:
+    """
+    Quadtree node for HashLife
+    Nodes are canonical (built only through HashLife._Join), so identity is equality
+    """
+    __slots__ = ("nw", "ne", "sw", "se", "level", "population")
+
+    def __init__(self, nw, ne, sw, se, level, population):
+        self.nw = nw
+        self.ne = ne
+        self.sw = sw
+        self.se = se
+        self.level = level
+        self.population = population
+
+class _CacheFull(Exception):
+    """
+    Raised out of HashLife._Step once the node cache passes maxNodes
+    """
+
+class HashLife:
+    """
+    Memoized quadtree Life engine for jumping far into the future
+    A level n node is a 2 ** n square. Stepping one returns its centered
+    half, 2 ** j generations later, and the result is cached per (node, j)
+
+    maxNodes caps the node cache. When a leap runs past it, the leap is abandoned,
+    the results are dropped, only nodes reachable from the root survive, and the
+    leap is redone as two half as long. Single generations are never split.
+
+    Rules with birth on 0 neighbors can be stored but not advanced,
+    since empty space wouldn't stay empty
+    """
+    def __init__(self, birthValues, deathValues, maxNodes=2000000):
+        self.birthValues = set(birthValues)
+        self.deathValues = set(deathValues)
+        self.table = RuleTable(self.birthValues, self.deathValues).tolist()
+        self.maxNodes = maxNodes
+
+        self.dead = _LifeNode(None, None, None, None, 0, 0)
+        self.alive = _LifeNode(None, None, None, None, 0, 1)
+
+        self.nodes = dict()
+        self.results = dict()
+        self.empties = [self.dead]
+
+        self.root = self._Empty(3)
+        self.originY = 0
+        self.originX = 0
+        self.generation = 0
+
+        # Whether _Step may give up on a full cache, off for leaps that can't be split
+        self.splittable = False
+
+    def SameRule(self, birthValues, deathValues):
+        return self.birthValues == set(birthValues) and self.deathValues == set(deathValues)
+
+    def _Join(self, nw, ne, sw, se):
+        key = (nw, ne, sw, se)
+        node = self.nodes.get(key)
+        if node is None:
+            node = _LifeNode(
+                nw, ne, sw, se,
+                nw.level + 1,
+                nw.population + ne.population + sw.population + se.population
+            )
+            self.nodes[key] = node
+        return node
+
+    def _Empty(self, level):
+        while len(self.empties) <= level:
+            e = self.empties[-1]
+            self.empties.append(self._Join(e, e, e, e))
+        return self.empties[level]
+
+    def _Center(self, node):
+        return self._Join(node.nw.se, node.ne.sw, node.sw.ne, node.se.nw)
+
+    def _Expand(self):
+        """
+        Surround the root with empty space, doubling its size
+        """
+        root = self.root
+        e = self._Empty(root.level - 1)
+        self.root = self._Join(
+            self._Join(e, e, e, root.nw),
+            self._Join(e, e, root.ne, e),
+            self._Join(e, root.sw, e, e),
+            self._Join(root.se, e, e, e)
+        )
+        self.originY -= 1 << (root.level - 1)
+        self.originX -= 1 << (root.level - 1)
+
+    def _Base(self, node):
+        """
+        One generation of a 4x4 node, returning the center 2x2
+        """
+        cells = [[0] * 4 for _ in range(4)]
+        for qy, qx, quad in ((0, 0, node.nw), (0, 2, node.ne), (2, 0, node.sw), (2, 2, node.se)):
+            cells[qy][qx] = quad.nw.population
+            cells[qy][qx + 1] = quad.ne.population
+            cells[qy + 1][qx] = quad.sw.population
+            cells[qy + 1][qx + 1] = quad.se.population
+
+        leaves = []
+        for y in (1, 2):
+            for x in (1, 2):
+                count = sum(cells[y - 1][x - 1:x + 2]) + sum(cells[y + 1][x - 1:x + 2]) + \
+                    cells[y][x - 1] + cells[y][x + 1]
+                leaves.append(self.alive if self.table[cells[y][x]][count] else self.dead)
+        return self._Join(*leaves)
+
+    def _Step(self, node, j):
+        """
+        Center half of node after 2 ** j generations, j <= node.level - 2
+        """
+        key = (node, j)
+        result = self.results.get(key)
+        if result is not None:
+            return result
+
+        if self.splittable and len(self.nodes) > self.maxNodes:
+            raise _CacheFull()
+
+        if node.population == 0:
+            result = self._Empty(node.level - 1)
+        elif node.level == 2:
+            result = self._Base(node)
+        else:
+            nw, ne, sw, se = node.nw, node.ne, node.sw, node.se
+            Join = self._Join
+
+            # Nine overlapping subsquares, each half the size of node
+            parts = [
+                nw, Join(nw.ne, ne.nw, nw.se, ne.sw), ne,
+                Join(nw.sw, nw.se, sw.nw, sw.ne), Join(nw.se, ne.sw, sw.ne, se.nw), Join(ne.sw, ne.se, se.nw, se.ne),
+                sw, Join(sw.ne, se.nw, sw.se, se.sw), se
+            ]
+
+            # A full step advances both halves, a shorter one only the second
+            if j == node.level - 2:
+                parts = [self._Step(part, j - 1) for part in parts]
+                j -= 1
+            else:
+                parts = [self._Center(part) for part in parts]
+
+            result = Join(
+                self._Step(Join(parts[0], parts[1], parts[3], parts[4]), j),
+                self._Step(Join(parts[1], parts[2], parts[4], parts[5]), j),
+                self._Step(Join(parts[3], parts[4], parts[6], parts[7]), j),
+                self._Step(Join(parts[4], parts[5], parts[7], parts[8]), j)
+            )
+
+        self.results[key] = result
+        return result
+
+    def _Build(self, cells):
+        """
+        Canonical node for a square 0/1 array whose side is a power of two
+        Built bottom up, deduplicating each level with numpy before joining
+        """
+        cells = np.asarray(cells, dtype=np.int64)
+
+        leaf = (self.dead, self.alive)
+        nodes = [
+            self._Join(leaf[code & 1], leaf[code >> 1 & 1], leaf[code >> 2 & 1], leaf[code >> 3 & 1])
+            for code in range(16)
+        ]
+        ids = cells[0::2, 0::2] | cells[0::2, 1::2] << 1 | cells[1::2, 0::2] << 2 | cells[1::2, 1::2] << 3
+
+        while ids.shape[0] > 1:
+            quads = np.stack((ids[0::2, 0::2], ids[0::2, 1::2], ids[1::2, 0::2], ids[1::2, 1::2]), axis=-1)
+            unique, inverse = np.unique(quads.reshape(-1, 4), axis=0, return_inverse=True)
+            nodes = [self._Join(nodes[a], nodes[b], nodes[c], nodes[d]) for a, b, c, d in unique.tolist()]
+            ids = inverse.reshape(ids.shape[0] // 2, ids.shape[1] // 2)
+
+        return nodes[ids[0, 0]]
+
+    def Load(self, cells, y=0, x=0):
+        """
+        Replace the universe with a uint8 array whose top left is at (y, x)
+        """
+        cells = np.asarray(cells, dtype=np.uint8)
+        level = 3
+        while (1 << level) < max(cells.shape):
+            level += 1
+        size = 1 << level
+
+        padded = np.zeros((size, size), dtype=np.int64)
+        padded[:cells.shape[0], :cells.shape[1]] = cells != 0
+
+        self.root = self._Build(padded)
+        self.originY = y
+        self.originX = x
+        self.generation = 0
+
+    def LoadBlocks(self, blocks, size):
+        """
+        Replace the universe with a dict of (blockY, blockX) -> size x size arrays
+        size has to be a power of two. The space between blocks is never filled in,
+        so far apart blocks cost no more than close ones
+        """
+        self.generation = 0
+        if len(blocks) == 0:
+            self.root = self._Empty(3)
+            self.originY = self.originX = 0
+            return
+
+        blockNodes = {key: self._Build(cells != 0) for key, cells in blocks.items()}
+        minY = min(y for y, x in blocks)
+        minX = min(x for y, x in blocks)
+        span = max(max(y - minY, x - minX) for y, x in blocks) + 1
+
+        level = 0
+        while (1 << level) < span:
+            level += 1
+
+        self.root = self._Assemble(blockNodes, size.bit_length() - 1, level, minY, minX, list(blockNodes))
+        self.originY = minY * size
+        self.originX = minX * size
+        while self.root.level < 3:
+            self._Expand()
+
+    def _Assemble(self, blockNodes, blockLevel, level, y, x, keys):
+        if len(keys) == 0:
+            return self._Empty(blockLevel + level)
+        if level == 0:
+            return blockNodes[(y, x)]
+
+        half = 1 << (level - 1)
+        quadrants = [[], [], [], []]
+        for key in keys:
+            quadrants[(key[0] >= y + half) * 2 + (key[1] >= x + half)].append(key)
+
+        return self._Join(
+            self._Assemble(blockNodes, blockLevel, level - 1, y, x, quadrants[0]),
+            self._Assemble(blockNodes, blockLevel, level - 1, y, x + half, quadrants[1]),
+            self._Assemble(blockNodes, blockLevel, level - 1, y + half, x, quadrants[2]),
+            self._Assemble(blockNodes, blockLevel, level - 1, y + half, x + half, quadrants[3])
+        )
+
+    def Advance(self, k):
+        """
+        Move the universe 2 ** k generations forward in a single step,
+        or in several smaller ones if the node cache fills up on the way
+        """
+        if 0 in self.birthValues:
+            raise ValueError("HashLife can't advance rules with birth on 0 neighbors")
+
+        # The pattern has to sit in the middle quarter with room to spread 2 ** k cells
+        # in every direction before the root's centered half would clip it
+        while self.root.level < k + 3 or \
+            self._Center(self._Center(self.root)).population != self.root.population:
+            self._Expand()
+
+        level = self.root.level
+        self.splittable = k > 0
+        try:
+            root = self._Step(self.root, k)
+        except _CacheFull:
+            self.Collect()
+            self.Advance(k - 1)
+            self.Advance(k - 1)
+            return
+        finally:
+            self.splittable = False
+
+        self.root = root
+        self.originY += 1 << (level - 2)
+        self.originX += 1 << (level - 2)
+        self.generation += 1 << k
+
+        if len(self.nodes) > self.maxNodes:
+            self.Collect()
+
+    def AdvanceBy(self, generations):
+        """
+        Any number of generations, one power of two jump per set bit
+        """
+        k = 0
+        while generations >> k:
+            if generations >> k & 1:
+                self.Advance(k)
+            k += 1
+
+    def Collect(self):
+        """
+        Drop cached results and every node not reachable from the root
+        """
+        self.results.clear()
+
+        kept = dict()
+        stack = [self.root] + self.empties[1:]
+        while len(stack) > 0:
+            node = stack.pop()
+            key = (node.nw, node.ne, node.sw, node.se)
+            if node.level == 0 or key in kept:
+                continue
+            kept[key] = node
+            stack.extend(key)
+        self.nodes = kept
+
+    def Window(self, y, x, height, width):
+        """
+        uint8 array of the cells in [y, y + height) x [x, x + width)
+        """
+        out = np.zeros((height, width), dtype=np.uint8)
+
+        stack = [(self.root, self.originY - y, self.originX - x)]
+        while len(stack) > 0:
+            node, top, left = stack.pop()
+            size = 1 << node.level
+            if node.population == 0 or top >= height or left >= width or \
+                top + size <= 0 or left + size <= 0:
+                continue
+
+            if node.level == 0:
+                out[top, left] = 1
+            else:
+                half = size // 2
+                stack.append((node.nw, top, left))
+                stack.append((node.ne, top, left + half))
+                stack.append((node.sw, top + half, left))
+                stack.append((node.se, top + half, left + half))
+        return out
+
+    def NodeCells(self, node):
+        """
+        uint8 array of a single node's cells
+        """
+        saved = (self.root, self.originY, self.originX)
+        self.root, self.originY, self.originX = node, 0, 0
+        size = 1 << node.level
+        cells = self.Window(0, 0, size, size)
+        self.root, self.originY, self.originX = saved
+        return cells
+
+    def LiveBlocks(self, level):
+        """
+        Yields (y, x, size) for every non-empty node at level, or the root if it is smaller
+        """
+        stack = [(self.root, self.originY, self.originX)]
+        while len(stack) > 0:
+            node, top, left = stack.pop()
+            if node.population == 0:
+                continue
+
+            if node.level <= level:
+                yield top, left, 1 << node.level
+            else:
+                half = 1 << (node.level - 1)
+                stack.append((node.nw, top, left))
+                stack.append((node.ne, top, left + half))
+                stack.append((node.sw, top + half, left))
+                stack.append((node.se, top + half, left + half))
+
+class ChunkedField(Field):
+    """
+    Unbounded universe stored as ChunkSize x ChunkSize arrays keyed by (chunkY, chunkX)
+    Chunks are made when something is born in them and dropped once they are empty,
+    so memory follows the live area instead of the bounding box.
+
+    The rect is only a viewport. Right drag or the arrow keys pan, the mouse wheel zooms
+    """
+    def __init__(self, rect):
+        self.chunks = dict()
+        self.cellSize = TileSize
+        self.offsetY = 0.0
+        self.offsetX = 0.0
+        self.dragging = False
+        super().__init__(rect)
+
+    @property
+    def grid(self):
+        return self.GetCells()
+
+    @grid.setter
+    def grid(self, cells):
+        self.SetCells(cells)
+
+    def _ViewSize(self):
+        return -(-self.rect.h // self.cellSize), -(-self.rect.w // self.cellSize)
+
+    def _ViewOrigin(self):
+        return int(np.floor(self.offsetY)), int(np.floor(self.offsetX))
+
+    def Window(self, y, x, height, width):
+        """
+        uint8 array of the cells in [y, y + height) x [x, x + width)
+        """
+        out = np.zeros((height, width), dtype=np.uint8)
+        for cy in range(y // ChunkSize, (y + height - 1) // ChunkSize + 1):
+            for cx in range(x // ChunkSize, (x + width - 1) // ChunkSize + 1):
+                chunk = self.chunks.get((cy, cx))
+                if chunk is None:
+                    continue
+                y0, x0 = max(y, cy * ChunkSize), max(x, cx * ChunkSize)
+                y1, x1 = min(y + height, (cy + 1) * ChunkSize), min(x + width, (cx + 1) * ChunkSize)
+                out[y0 - y:y1 - y, x0 - x:x1 - x] = \
+                    chunk[y0 - cy * ChunkSize:y1 - cy * ChunkSize, x0 - cx * ChunkSize:x1 - cx * ChunkSize]
+        return out
+
+    def Load(self, cells, y, x):
+        """
+        Overwrite the cells in the rectangle whose top left is (y, x)
+        """
+        self.changedRegions = None
+        cells = np.asarray(cells, dtype=np.uint8)
+        height, width = cells.shape
+        for cy in range(y // ChunkSize, (y + height - 1) // ChunkSize + 1):
+            for cx in range(x // ChunkSize, (x + width - 1) // ChunkSize + 1):
+                y0, x0 = max(y, cy * ChunkSize), max(x, cx * ChunkSize)
+                y1, x1 = min(y + height, (cy + 1) * ChunkSize), min(x + width, (cx + 1) * ChunkSize)
+                part = cells[y0 - y:y1 - y, x0 - x:x1 - x]
+
+                chunk = self.chunks.get((cy, cx))
+                if chunk is None:
+                    if not part.any():
+                        continue
+                    chunk = self.chunks[(cy, cx)] = np.zeros((ChunkSize, ChunkSize), dtype=np.uint8)
+
+                chunk[y0 - cy * ChunkSize:y1 - cy * ChunkSize, x0 - cx * ChunkSize:x1 - cx * ChunkSize] = part
+                if not chunk.any():
+                    del self.chunks[(cy, cx)]
+
+    def GetCells(self):
+        """
+        The cells currently in view
+        """
+        return self.Window(*self._ViewOrigin(), *self._ViewSize())
+
+    def SetCells(self, cells):
+        self.Load(cells, *self._ViewOrigin())
+
+    def Regions(self, keys=None):
+        """
+        One region per chunk, over the whole universe rather than the view
+        """
+        if keys is None:
+            return list(self.chunks.items())
+        return [(key, self.chunks.get(key)) for key in keys]
+
+    def Snapshot(self):
+        """
+        Every chunk, so rewinding covers the whole universe and not just the view
+        """
+        return dict(self.chunks)
+
+    def Restore(self, blocks):
+        self.chunks = {key: np.array(cells, dtype=np.uint8) for key, cells in blocks.items() if cells.any()}
+        self.changedRegions = None
+
+    def Toggle(self, y, x):
+        self.changedRegions = None
+        key = (y // ChunkSize, x // ChunkSize)
+        chunk = self.chunks.get(key)
+        if chunk is None:
+            chunk = self.chunks[key] = np.zeros((ChunkSize, ChunkSize), dtype=np.uint8)
+
+        chunk[y % ChunkSize, x % ChunkSize] ^= 1
+        if not chunk.any():
+            del self.chunks[key]
+
+    def Randomize(self, density=.5):
+        self.SetCells(np.random.random(self._ViewSize()) < density)
+
+    def Clear(self):
+        self.chunks = dict()
+        self.changedRegions = None
+
+    def Progress(self, birthValues, deathValues):
+        """
+        Simulate one round of the game
+        """
+        # Birth on 0 neighbors would fill the whole infinite plane, so it is ignored here
+        table = RuleTable(set(birthValues) - {0}, deathValues)
+        size = ChunkSize
+
+        # Neighboring chunks can only get births if the facing edge has something alive
+        candidates = set(self.chunks)
+        for (cy, cx), chunk in self.chunks.items():
+            for dy in (-1, 0, 1):
+                for dx in (-1, 0, 1):
+                    if (cy + dy, cx + dx) not in candidates and \
+                        chunk[_EdgeSlices[dy], _EdgeSlices[dx]].any():
+                        candidates.add((cy + dy, cx + dx))
+        self.changedRegions = list(candidates)
+        if len(candidates) == 0:
+            return
+
+        # Every candidate gets its own padded copy with a one cell border from its neighbors
+        keys = list(candidates)
+        padded = np.zeros((len(keys), size + 2, size + 2), dtype=np.uint8)
+        for i, (cy, cx) in enumerate(keys):
+            for dy in (-1, 0, 1):
+                for dx in (-1, 0, 1):
+                    neighbor = self.chunks.get((cy + dy, cx + dx))
+                    if neighbor is not None:
+                        padded[i, _HaloTargets[dy], _HaloTargets[dx]] = \
+                            neighbor[_HaloSources[dy], _HaloSources[dx]]
+
+        counts = np.zeros((len(keys), size, size), dtype=np.uint8)
+        for dy in range(3):
+            for dx in range(3):
+                if dy == 1 and dx == 1:
+                    continue
+                counts += padded[:, dy:dy + size, dx:dx + size]
+        newChunks = table[padded[:, 1:-1, 1:-1], counts]
+
+        self.activeCells = newChunks.size
+        alive = newChunks.any(axis=(1, 2))
+        self.chunks = {key: newChunks[i] for i, key in enumerate(keys) if alive[i]}
+
+    def Leap(self, birthValues, deathValues, k):
+        """
+        Jump 2 ** k generations ahead with HashLife, using the whole universe
+        """
+        # Birth on 0 neighbors is ignored, same as in Progress
+        birthValues = set(birthValues) - {0}
+        life = getattr(self, "hashLife", None)
+        if life is None or not life.SameRule(birthValues, deathValues):
+            life = self.hashLife = HashLife(birthValues, deathValues)
+
+        life.LoadBlocks(self.chunks, ChunkSize)
+        life.Advance(k)
+
+        self.chunks = dict()
+        for y, x, size in life.LiveBlocks(ChunkSize.bit_length() - 1):
+            self.Load(life.Window(y, x, size, size), y, x)
+
+    def LoadPattern(self, path):
+        """
+        Reads the whole pattern, however large, with its top left at the top left of the view
+        """
+        top, left = self._ViewOrigin()
+        self.Clear()
+        if path.endswith(".mc"):
+            life, birthValues, deathValues = ReadMacrocell(path)
+            blocks = list(life.LiveBlocks(ChunkSize.bit_length() - 1))
+            if len(blocks) > 0:
+                minY = min(y for y, x, size in blocks)
+                minX = min(x for y, x, size in blocks)
+                for y, x, size in blocks:
+                    self.Load(life.Window(y, x, size, size), y - minY + top, x - minX + left)
+        else:
+            cells, birthValues, deathValues = ReadRLE(path)
+            self.Load(cells, top, left)
+        return birthValues, deathValues
+
+    def SavePattern(self, path, birthValues, deathValues):
+        """
+        Saves the whole universe, not just the view
+        """
+        if path.endswith(".mc"):
+            life = HashLife(birthValues, deathValues)
+            life.LoadBlocks(self.chunks, ChunkSize)
+            WriteMacrocell(path, life)
+            return
+
+        cells = np.zeros((0, 0), dtype=np.uint8)
+        if len(self.chunks) > 0:
+            minY = min(cy for cy, cx in self.chunks)
+            minX = min(cx for cy, cx in self.chunks)
+            maxY = max(cy for cy, cx in self.chunks)
+            maxX = max(cx for cy, cx in self.chunks)
+            cells = self.Window(
+                minY * ChunkSize, minX * ChunkSize,
+                (maxY - minY + 1) * ChunkSize, (maxX - minX + 1) * ChunkSize
+            )
+        WriteRLE(path, cells, birthValues, deathValues)
+
+    def Draw(self, surface):
+        pygame.draw.rect(surface, ForegroundColor, self.rect)
+
+        previousClip = surface.get_clip()
+        surface.set_clip(self.rect)
+
+        # Only chunks that overlap the viewport are touched
+        span = ChunkSize * self.cellSize
+        viewHeight, viewWidth = self._ViewSize()
+        firstY = int(np.floor(self.offsetY / ChunkSize))
+        firstX = int(np.floor(self.offsetX / ChunkSize))
+        for cy in range(firstY, int(np.floor((self.offsetY + viewHeight) / ChunkSize)) + 1):
+            for cx in range(firstX, int(np.floor((self.offsetX + viewWidth) / ChunkSize)) + 1):
+                chunk = self.chunks.get((cy, cx))
+                if chunk is None:
+                    continue
+
+                image = pygame.surfarray.make_surface(CellColors[chunk.T])
+                surface.blit(
+                    pygame.transform.scale(image, (span, span)),
+                    (
+                        round(self.rect.x + (cx * ChunkSize - self.offsetX) * self.cellSize),
+                        round(self.rect.y + (cy * ChunkSize - self.offsetY) * self.cellSize)
+                    )
+                )
+
+        surface.set_clip(previousClip)
+        pygame.draw.rect(surface, Black, self.rect, 2)
+
+    def _Zoom(self, pos, newCellSize):
+        # Keep the cell under the cursor in place
+        px = (pos[0] - self.rect.x) / self.cellSize
+        py = (pos[1] - self.rect.y) / self.cellSize
+        self.offsetX += px - px * self.cellSize / newCellSize
+        self.offsetY += py - py * self.cellSize / newCellSize
+        self.cellSize = newCellSize
+
+    def HandleEvent(self, event):
+        if event.type == pygame.MOUSEBUTTONDOWN and self.rect.collidepoint(event.pos):
+            if event.button == 1:
+                self.Toggle(
+                    int(np.floor(self.offsetY + (event.pos[1] - self.rect.y) / self.cellSize)),
+                    int(np.floor(self.offsetX + (event.pos[0] - self.rect.x) / self.cellSize))
+                )
+            elif event.button == 3:
+                self.dragging = True
+
+        elif event.type == pygame.MOUSEBUTTONUP and event.button == 3:
+            self.dragging = False
+
+        elif event.type == pygame.MOUSEMOTION and self.dragging:
+            self.offsetX -= event.rel[0] / self.cellSize
+            self.offsetY -= event.rel[1] / self.cellSize
+
+        elif event.type == pygame.MOUSEWHEEL:
+            pos = pygame.mouse.get_pos()
+            if self.rect.collidepoint(pos):
+                newCellSize = min(max(self.cellSize + event.y, 1), MaxCellSize)
+                self._Zoom(pos, newCellSize)
+
+        elif event.type == pygame.KEYDOWN:
+            step = PanStep / self.cellSize
+            if event.key == pygame.K_LEFT:
+                self.offsetX -= step
+            elif event.key == pygame.K_RIGHT:
+                self.offsetX += step
+            elif event.key == pygame.K_UP:
+                self.offsetY -= step
+            elif event.key == pygame.K_DOWN:
+                self.offsetY += step
+
+def _Mix(z):
+    """
+    splitmix64 finalizer over a uint64 array, wrapping on overflow
+    """
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return z ^ (z >> np.uint64(31))
+
+class CycleDetector:
+    """
+    Notices when the field starts repeating itself
+    Each generation is Zobrist hashed: every cell has a random 64 bit key and the hash
+    is the XOR of the keys of the live cells. The field is split into Regions and the
+    hash is the XOR of theirs, so only regions the last Progress touched get rehashed.
+    A cell's key is its position mixed with its region's key, so an unbounded field
+    needs no table per chunk. The last historyLength hashes are kept,
+    so still lifes (period 1) and oscillators up to that period are caught.
+    An empty field counts as a still life
+
+    Observe has to be called after every Progress, anything else that edits
+    the field needs a Reset
+    """
+    def __init__(self, historyLength=CycleHistory, seed=0):
+        self.historyLength = historyLength
+        self.seed = seed
+        self.keys = dict()
+        self.Reset()
+
+    def Reset(self):
+        self.regionHashes = dict()
+        self.hash = 0
+        self.generation = 0
+        self.history = deque()
+        self.seen = dict()
+        self.period = None
+
+    def _Keys(self, key, shape):
+        keys = self.keys.get(key)
+        if keys is None or keys.shape != shape:
+            if len(self.keys) >= CycleKeyCache:
+                self.keys.clear()
+            salt = _Mix(np.array([hash((self.seed, key))], dtype=np.int64).view(np.uint64))
+            ys, xs = np.indices(shape, dtype=np.uint64)
+            keys = self.keys[key] = _Mix(salt ^ (ys << np.uint64(32) | xs))
+        return keys
+
+    def Observe(self, field):
+        """
+        Feed the field after its next generation, returns its period if it has been seen before
+        """
+        if self.generation == 0 or field.changedRegions is None:
+            self.regionHashes = dict()
+            self.hash = 0
+            regions = field.Regions()
+        else:
+            regions = field.Regions(field.changedRegions)
+
+        for key, cells in regions:
+            value = 0
+            if cells is not None:
+                cells = np.asarray(cells)
+                value = int(np.bitwise_xor.reduce(self._Keys(key, cells.shape)[cells != 0]))
+            self.hash ^= self.regionHashes.pop(key, 0) ^ value
+            if value != 0:
+                self.regionHashes[key] = value
+
+        lastSeen = self.seen.get(self.hash)
+        self.period = None if lastSeen is None else self.generation - lastSeen
+
+        self.seen[self.hash] = self.generation
+        self.history.append((self.hash, self.generation))
+        if len(self.history) > self.historyLength:
+            oldHash, oldGeneration = self.history.popleft()
+            if self.seen.get(oldHash) == oldGeneration:
+                del self.seen[oldHash]
+
+        self.generation += 1
+        return self.period
+
+class History:
+    """
+    Past generations of the field, so it can be rewound and scrubbed through
+    Generations are recorded as Field.Snapshot dicts of equally sized blocks, so an
+    unbounded field is kept whole rather than just the part in view.
+    One generation in keyframeInterval is stored whole, the ones in between as
+    the XOR of each block that changed since the generation before. Both are bit
+    packed and zlib compressed, and since little changes per generation the deltas are tiny.
+    Getting any generation decodes its keyframe and at most keyframeInterval - 1 deltas
+
+    Once the frames in memory pass memoryLimit bytes the oldest are moved
+    to a temporary file that is read back through mmap. Past lengthLimit generations,
+    or spillLimit bytes in the file, the oldest keyframe and its deltas are forgotten
+    """
+    def __init__(self, keyframeInterval=HistoryKeyframes, memoryLimit=HistoryMemory,
+            lengthLimit=HistoryLength, spillLimit=HistorySpill):
+        self.keyframeInterval = keyframeInterval
+        self.memoryLimit = memoryLimit
+        self.lengthLimit = max(lengthLimit, keyframeInterval)
+        self.spillLimit = spillLimit
+        self.spill = None
+        self.map = None
+        self.Reset()
+
+    def Reset(self):
+        # frames[i] is generation first + i, as its compressed bytes while in memory
+        # or (offset, length) once spilled. Frames before firstInMemory are spilled
+        self.frames = []
+        self.first = 0
+        self.memoryUsed = 0
+        self.firstInMemory = 0
+        self.shape = None
+        self.previous = None
+
+        # The file holds spilled frames in [spillStart, spillEnd), anything before is forgotten
+        self.spillStart = 0
+        self.spillEnd = 0
+        self._Unmap()
+        if self.spill is not None:
+            self.spill.truncate(0)
+
+    def _Unmap(self):
+        # The file can't be resized under a live map on every platform
+        if self.map is not None:
+            self.map.close()
+            self.map = None
+
+    @property
+    def generation(self):
+        """
+        The last recorded generation
+        """
+        return self.first + len(self.frames) - 1
+
+    def Record(self, blocks):
+        """
+        Append the next generation, a Field.Snapshot
+        """
+        blocks = {key: np.array(cells, dtype=np.uint8) for key, cells in blocks.items()}
+        shape = next((cells.shape for cells in blocks.values()), self.shape)
+        if self.shape is not None and shape != self.shape:
+            self.Reset()
+        self.shape = shape
+
+        # first is always a multiple of keyframeInterval, so keyframes stay aligned
+        if len(self.frames) % self.keyframeInterval == 0:
+            frame = {key: cells for key, cells in blocks.items() if cells.any()}
+        else:
+            frame = dict()
+            for key in blocks.keys() | self.previous.keys():
+                if key not in self.previous:
+                    change = blocks[key]
+                elif key not in blocks:
+                    change = self.previous[key]
+                else:
+                    change = blocks[key] ^ self.previous[key]
+                if change.any():
+                    frame[key] = change
+        self.previous = blocks
+
+        data = self._Encode(frame)
+        self.frames.append(data)
+        self.memoryUsed += len(data)
+        if self.memoryUsed > self.memoryLimit:
+            self._Spill()
+        self._Forget()
+
+    def _Encode(self, frame):
+        keys = np.array(list(frame), dtype=np.int64).reshape(-1, 2)
+        bits = np.packbits(np.array(list(frame.values()), dtype=np.uint8))
+        return zlib.compress(len(frame).to_bytes(8, "little") + keys.tobytes() + bits.tobytes(), 1)
+
+    def _Spill(self):
+        if self.spill is None:
+            self.spill = tempfile.TemporaryFile()
+
+        self.spill.seek(self.spillEnd)
+        while self.memoryUsed > self.memoryLimit // 2 and self.firstInMemory < len(self.frames):
+            data = self.frames[self.firstInMemory]
+            self.frames[self.firstInMemory] = (self.spillEnd, len(data))
+            self.spill.write(data)
+            self.spillEnd += len(data)
+            self.memoryUsed -= len(data)
+            self.firstInMemory += 1
+        self.spill.flush()
+        self._Unmap()
+
+    def _Forget(self):
+        """
+        Drop the oldest keyframe and its deltas while over a limit, always keeping the newest
+        """
+        while len(self.frames) > self.keyframeInterval and (
+            len(self.frames) > self.lengthLimit or self.spillEnd - self.spillStart > self.spillLimit
+        ):
+            for frame in self.frames[:self.keyframeInterval]:
+                if isinstance(frame, tuple):
+                    self.spillStart = frame[0] + frame[1]
+                else:
+                    self.memoryUsed -= len(frame)
+            del self.frames[:self.keyframeInterval]
+            self.first += self.keyframeInterval
+            self.firstInMemory = max(self.firstInMemory - self.keyframeInterval, 0)
+
+        # Give back the forgotten space once it is most of the file
+        if self.spillStart > 0 and self.spillStart >= self.spillEnd - self.spillStart:
+            self._Unmap()
+            self.spill.seek(self.spillStart)
+            spill = tempfile.TemporaryFile()
+            shutil.copyfileobj(self.spill, spill)
+            spill.flush()
+            self.spill.close()
+            self.spill = spill
+            for i in range(self.firstInMemory):
+                offset, length = self.frames[i]
+                self.frames[i] = (offset - self.spillStart, length)
+            self.spillEnd -= self.spillStart
+            self.spillStart = 0
+
+    def _Frame(self, index):
+        frame = self.frames[index]
+        if isinstance(frame, tuple):
+            offset, length = frame
+            if self.map is None:
+                self.map = mmap.mmap(self.spill.fileno(), 0, access=mmap.ACCESS_READ)
+            frame = self.map[offset:offset + length]
+
+        data = zlib.decompress(frame)
+        count = int.from_bytes(data[:8], "little")
+        keys = np.frombuffer(data[8:8 + 16 * count], dtype=np.int64).reshape(-1, 2).tolist()
+        if count == 0:
+            return dict()
+
+        bits = np.frombuffer(data[8 + 16 * count:], dtype=np.uint8)
+        size = self.shape[0] * self.shape[1]
+        blocks = np.unpackbits(bits, count=count * size).reshape(count, *self.shape)
+        return {tuple(key): blocks[i] for i, key in enumerate(keys)}
+
+    def Get(self, generation):
+        """
+        A recorded generation, as a dict of blocks like Field.Snapshot
+        """
+        if generation < self.first or generation > self.generation:
+            raise ValueError(f"Generation {generation} is not in the history")
+
+        index = generation - self.first
+        keyframe = index - index % self.keyframeInterval
+        blocks = self._Frame(keyframe)
+        for i in range(keyframe + 1, index + 1):
+            for key, change in self._Frame(i).items():
+                if key in blocks:
+                    blocks[key] = blocks[key] ^ change
+                else:
+                    blocks[key] = change
+        return {key: cells for key, cells in blocks.items() if cells.any()}
+
+    def Truncate(self, generation):
+        """
+        Forget everything after generation, so the field can carry on from there
+        """
+        blocks = self.Get(generation)
+        index = generation - self.first
+        for frame in self.frames[index + 1:]:
+            if not isinstance(frame, tuple):
+                self.memoryUsed -= len(frame)
+        del self.frames[index + 1:]
+        self.previous = blocks
+
+        if self.firstInMemory > len(self.frames):
+            self.firstInMemory = len(self.frames)
+            offset, length = self.frames[-1]
+            self._Unmap()
+            self.spillEnd = offset + length
+            self.spill.truncate(self.spillEnd)
+        return blocks
+
+Engines = {
+    "list": Field,
+    "numpy": NumpyField,
+    "sparse": SparseField,
+    "parallel": ParallelField,
+    "packed": PackedField,
+    "chunked": ChunkedField,
+}
+
+def ParseRule(rule):
+    """
+    "B3/S23" -> (birthValues, deathValues)
+    Death values are every count the S part leaves out
+    """
+    birthValues, surviveValues = set(), set()
+    for part in rule.upper().split("/"):
+        values = {int(c) for c in part[1:]}
+        if part.startswith("B"):
+            birthValues = values
+        elif part.startswith("S"):
+            surviveValues = values
+        else:
+            raise ValueError(f"Can't read rule {rule}")
+    return birthValues, set(range(9)) - surviveValues
+
+def FormatRule(birthValues, deathValues):
+    birth = "".join(str(i) for i in sorted(birthValues))
+    survive = "".join(str(i) for i in range(9) if i not in deathValues)
+    return f"B{birth}/S{survive}"
+
+_RleToken = re.compile(r"(\d*)([a-zA-Z.$!])")
+
+# A value runs up to the comma before the next key, so rules like B3/S23:T100,100 stay whole
+_RleHeaderPair = re.compile(r"(\w+)\s*=\s*(.*?)\s*(?=,\s*\w+\s*=|$)")
+
+RuleNames = {
+    "life": "B3/S23",
+    "highlife": "B36/S23",
+    "seeds": "B2/S",
+    "daynight": "B3678/S34678",
+}
+
+def _ReadRule(rule):
+    # Bounded grid suffixes like :T100,100 aren't supported, the pattern runs on the usual field
+    rule = rule.split(":")[0].strip()
+    if rule.lower() in RuleNames:
+        return ParseRule(RuleNames[rule.lower()])
+    if re.fullmatch(r"[BbSs]\d*/[BbSs]\d*", rule):
+        return ParseRule(rule)
+    # Old style RLE rules are survive/birth digits, like 23/3
+    match = re.fullmatch(r"(\d*)/(\d*)", rule)
+    if match is None:
+        raise ValueError(f"Unsupported rule {rule}")
+    survive, birth = match.groups()
+    return ParseRule(f"B{birth}/S{survive}")
+
+def ReadRLE(path, out=None):
+    """
+    Streams an RLE pattern into the uint8 array out, clipped to its size
+    The body is read a megabyte at a time and runs are written as slices, so nothing
+    the size of the pattern is ever built in Python. If out is None an array the size
+    from the header is made. Returns (cells, birthValues, deathValues)
+    """
+    birthValues, deathValues = ParseRule("B3/S23")
+    with open(path) as f:
+        line = f.readline()
+        while line.startswith("#") or line.strip() == "":
+            if line == "":
+                raise ValueError(f"{path} has no RLE header")
+            line = f.readline()
+
+        header = {key: value for key, value in _RleHeaderPair.findall(line.strip())}
+        if "rule" in header:
+            birthValues, deathValues = _ReadRule(header["rule"])
+
+        if out is None:
+            out = np.zeros((int(header["y"]), int(header["x"])), dtype=np.uint8)
+
+        y = x = 0
+        pending = ""
+        done = False
+        while not done:
+            chunk = f.read(1 << 20)
+            if chunk == "":
+                break
+            text = pending + chunk
+
+            # A count at the very end might carry on in the next chunk
+            match = re.search(r"\d+$", text)
+            if match is None:
+                pending = ""
+            else:
+                pending = match.group()
+                text = text[:match.start()]
+
+            for token in _RleToken.finditer(text):
+                count = int(token.group(1)) if token.group(1) else 1
+                tag = token.group(2)
+                if tag == "$":
+                    y += count
+                    x = 0
+                elif tag == "!":
+                    done = True
+                    break
+                elif tag in "b.":
+                    x += count
+                else:
+                    # Any other letter is a live state
+                    if y < out.shape[0]:
+                        out[y, x:x + count] = 1
+                    x += count
+
+    return out, birthValues, deathValues
+
+def WriteRLE(path, cells, birthValues, deathValues, lineLength=70):
+    """
+    Writes cells as RLE, one row at a time
+    """
+    cells = np.asarray(cells) != 0
+    height, width = cells.shape
+
+    with open(path, "w") as f:
+        f.write(f"x = {width}, y = {height}, rule = {FormatRule(birthValues, deathValues)}\n")
+
+        line = []
+        lineSize = 0
+        lastRow = 0
+        for y in range(height):
+            # Alive runs are [starts[i], ends[i])
+            edges = np.flatnonzero(np.diff(cells[y].astype(np.int8), prepend=0, append=0))
+            if len(edges) == 0:
+                continue
+
+            tokens = []
+            if y > lastRow:
+                tokens.append(f"{y - lastRow if y - lastRow > 1 else ''}$")
+            lastRow = y
+
+            x = 0
+            for start, end in zip(edges[0::2].tolist(), edges[1::2].tolist()):
+                if start > x:
+                    tokens.append(f"{start - x if start - x > 1 else ''}b")
+                tokens.append(f"{end - start if end - start > 1 else ''}o")
+                x = end
+
+            for token in tokens:
+                if lineSize + len(token) > lineLength:
+                    f.write("".join(line) + "\n")
+                    line = []
+                    lineSize = 0
+                line.append(token)
+                lineSize += len(token)
+
+        f.write("".join(line) + "!\n")
+
+def ReadMacrocell(path):
+    """
+    Reads a macrocell (.mc) file straight into HashLife nodes
+    Returns (life, birthValues, deathValues) with the pattern's root at (0, 0)
+    """
+    birthValues, deathValues = ParseRule("B3/S23")
+    life = None
+    nodes = [None]
+
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if line == "" or line.startswith("["):
+                continue
+            if line.startswith("#"):
+                if line.startswith("#R"):
+                    birthValues, deathValues = _ReadRule(line[2:].strip())
+                continue
+
+            if life is None:
+                life = HashLife(birthValues, deathValues)
+
+            if line[0] in ".*$":
+                # 8x8 leaf, rows end in $ and trailing dead cells are left out
+                cells = np.zeros((8, 8), dtype=np.uint8)
+                for y, row in enumerate(line.split("$")[:8]):
+                    for x, cell in enumerate(row[:8]):
+                        cells[y, x] = cell == "*"
+                nodes.append(life._Build(cells))
+            else:
+                level, *children = (int(n) for n in line.split())
+                nodes.append(life._Join(*(
+                    nodes[child] if child > 0 else life._Empty(level - 1)
+                    for child in children
+                )))
+
+    if life is None:
+        life = HashLife(birthValues, deathValues)
+    elif len(nodes) > 1:
+        life.root = nodes[-1]
+        while life.root.level < 3:
+            life._Expand()
+    return life, birthValues, deathValues
+
+def _MacrocellLines(life, node, indices):
+    """
+    Post order lines for every unwritten non-empty node under node
+    """
+    if node.population == 0 or node in indices:
+        return
+
+    if node.level == 3:
+        rows = []
+        for row in life.NodeCells(node).tolist():
+            rows.append("".join("*" if cell else "." for cell in row).rstrip("."))
+        while rows[-1] == "":
+            rows.pop()
+        line = "".join(row + "$" for row in rows)
+    else:
+        children = (node.nw, node.ne, node.sw, node.se)
+        for child in children:
+            yield from _MacrocellLines(life, child, indices)
+        line = f"{node.level} " + " ".join(str(indices.get(child, 0)) for child in children)
+
+    indices[node] = len(indices) + 1
+    yield line
+
+def WriteMacrocell(path, life):
+    """
+    Writes a HashLife universe as a macrocell file, every shared node only once
+    """
+    with open(path, "w") as f:
+        f.write("[M2] (GameOfLife.py)\n")
+        f.write(f"#R {FormatRule(life.birthValues, life.deathValues)}\n")
+        root = life.root
+        if root.population == 0:
+            return
+        for line in _MacrocellLines(life, root, dict()):
+            f.write(line + "\n")
+
+def _PatternWindow(life, height, width):
+    """
+    height x width cells from the top left corner of the live area
+    """
+    blocks = list(life.LiveBlocks(3))
+    if len(blocks) == 0:
+        return np.zeros((height, width), dtype=np.uint8)
+
+    top = min(y for y, x, size in blocks)
+    left = min(x for y, x, size in blocks)
+    cells = life.Window(top, left, height + 8, width + 8)
+
+    # Blocks are 8 cells wide, so there can be a few empty rows and columns to trim
+    rows = np.flatnonzero(cells.any(axis=1))
+    columns = np.flatnonzero(cells.any(axis=0))
+    return cells[rows[0]:rows[0] + height, columns[0]:columns[0] + width]
+
+def _RunEngine(engine, cells, birthValues, deathValues, generations, measureMemory=False):
+    """
+    Runs generations on a fresh field, returns (seconds, population, peakMemory)
+    With measureMemory tracemalloc only starts once the field is built and seeded,
+    so the peak is what stepping needs on top of the engine's own grid
+    """
+    if engine == "hashlife":
+        life = HashLife(birthValues, deathValues)
+        life.Load(cells)
+        step = lambda: life.AdvanceBy(generations)
+        population = lambda: life.root.population
+    else:
+        height, width = cells.shape
+        field = Engines[engine](pygame.Rect(0, 0, width * TileSize, height * TileSize))
+        field.SetCells(cells)
+        def step():
+            for _ in range(generations):
+                field.Progress(birthValues, deathValues)
+        population = lambda: int(field.GetCells().sum())
+
+    peakMemory = None
+    if measureMemory:
+        tracemalloc.start()
+    start = perf_counter()
+    step()
+    seconds = perf_counter() - start
+    if measureMemory:
+        peakMemory = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return seconds, population(), peakMemory
+
+def Benchmark(engine, height, width, density=.5, rule="B3/S23", generations=100, seed=0, measureMemory=True):
+    """
+    Headless run of one engine on a seeded random soup
+    Timing and memory are separate runs so tracemalloc doesn't slow the timed one.
+    chunked and hashlife are unbounded, so their populations won't match the others
+    """
+    birthValues, deathValues = ParseRule(rule)
+    cells = (np.random.default_rng(seed).random((height, width)) < density).astype(np.uint8)
+
+    # Warm up first so Numba compile time isn't counted
+    _RunEngine(engine, cells[:16, :16], birthValues, deathValues, 1)
+    seconds, population, _ = _RunEngine(engine, cells, birthValues, deathValues, generations)
+
+    peakMemory = None
+    if measureMemory:
+        peakMemory = _RunEngine(engine, cells, birthValues, deathValues, generations, True)[2]
+
+    return {
+        "engine": engine,
+        "height": height,
+        "width": width,
+        "density": density,
+        "rule": rule,
+        "generations": generations,
+        "seed": seed,
+        "seconds": seconds,
+        "generationsPerSecond": generations / seconds if seconds > 0 else float("inf"),
+        "cellUpdatesPerSecond": generations * height * width / seconds if seconds > 0 else float("inf"),
+        "peakMemory": peakMemory,
+        "population": population,
+    }
+
+CensusFields = [
+    "soup", "seed", "rule", "height", "width", "density",
+    "initialPopulation", "finalPopulation", "outcome", "period", "settledAt", "generations"
+]
+
+def _CensusWorkerInit():
+    # SDL turns SIGTERM into a quit event, which would stop Pool.terminate from ending workers
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+def _CensusSoup(task):
+    """
+    Runs one random soup until it repeats or runs out of generations
+    """
+    soup, seed, engine, height, width, density, rule, maxGenerations = task
+    birthValues, deathValues = ParseRule(rule)
+
+    _random.seed(seed)
+    np.random.seed(seed % 2 ** 32)
+    field = Engines[engine](pygame.Rect(0, 0, width * TileSize, height * TileSize))
+    field.Randomize(density)
+
+    detector = CycleDetector()
+    initialPopulation = int(field.GetCells().sum())
+    period = detector.Observe(field)
+    while period is None and detector.generation <= maxGenerations:
+        field.Progress(birthValues, deathValues)
+        period = detector.Observe(field)
+
+    finalPopulation = int(field.GetCells().sum())
+    if period is None:
+        outcome = "grows" if finalPopulation > initialPopulation else "unsettled"
+    elif finalPopulation == 0:
+        outcome = "dies out"
+    elif period == 1:
+        outcome = "stabilizes"
+    else:
+        outcome = "oscillates"
+
+    return {
+        "soup": soup,
+        "seed": seed,
+        "rule": rule,
+        "height": height,
+        "width": width,
+        "density": density,
+        "initialPopulation": initialPopulation,
+        "finalPopulation": finalPopulation,
+        "outcome": outcome,
+        "period": period,
+        "settledAt": None if period is None else detector.generation - 1 - period,
+        "generations": detector.generation - 1,
+    }
+
+def _ReadCensus(path):
+    """
+    Results already in a census file. A half written last line is dropped
+    """
+    results = []
+    if not os.path.exists(path):
+        return results
+
+    # Cut off anything after the last complete line so appending starts clean
+    with open(path, "rb+") as f:
+        data = f.read()
+        if not data.endswith(b"\n"):
+            f.truncate(data.rfind(b"\n") + 1)
+
+    with open(path, newline="") as f:
+        if path.endswith(".csv"):
+            for row in csv.DictReader(f):
+                if None not in row.values():
+                    results.append(row)
+        else:
+            for line in f:
+                try:
+                    results.append(json.loads(line))
+                except json.JSONDecodeError:
+                    pass
+    return results
+
+def Census(path, soups, height, width, density=.5, rule="B3/S23", maxGenerations=5000,
+        engine="numpy", processes=CORES, seed=0):
+    """
+    Runs soups random soups of one rule on a process pool and classifies each
+    Results are streamed to path as they finish, as CSV if it ends in .csv and JSON lines
+    otherwise. Soups already in the file are skipped, so an interrupted census can be rerun
+    with the same arguments to pick up where it left off.
+    Returns how many soups had each outcome
+    """
+    results = _ReadCensus(path)
+    done = {int(result["soup"]) for result in results}
+    tasks = [
+        (soup, seed + soup, engine, height, width, density, rule, maxGenerations)
+        for soup in range(soups) if soup not in done
+    ]
+
+    isCsv = path.endswith(".csv")
+    newFile = not os.path.exists(path) or os.path.getsize(path) == 0
+    with open(path, "a", newline="") as f, multiprocessing.Pool(processes, _CensusWorkerInit) as pool:
+        if isCsv:
+            writer = csv.DictWriter(f, CensusFields)
+            if newFile:
+                writer.writeheader()
+
+        for result in pool.imap_unordered(_CensusSoup, tasks):
+            if isCsv:
+                writer.writerow(result)
+            else:
+                f.write(json.dumps(result) + "\n")
+            f.flush()
+            results.append(result)
+
+    outcomes = dict()
+    for result in results:
+        outcomes[result["outcome"]] = outcomes.get(result["outcome"], 0) + 1
+    return outcomes
+
+def Main(fieldType=SparseField, loadPath=None, savePath="GameOfLife.rle"):
+    Screen = pygame.display.set_mode((ScreenWidth + Border * 2, ScreenHeight + Border * 3))
 
     paused = True
 
-    field = Field(
+    field = fieldType(
         pygame.Rect(
             Border, Border,
             ScreenWidth,
@@ -444,7 +2263,17 @@ def Main():
     )
     currentX += SelectorWidth + Border
 
+    if loadPath is not None:
+        birthValues, deathValues = field.LoadPattern(loadPath)
+        birthSelector.SetActiveValues(birthValues)
+        deathSelector.SetActiveValues(deathValues)
+
     lastStageTime = time()
+    detector = CycleDetector()
+    history = History()
+    history.Record(field.Snapshot())
+    shown = history.generation # Behind history.generation while scrubbing back
+    rule = (birthSelector.GetActiveValues(), deathSelector.GetActiveValues())
 
     while True:
         
@@ -457,27 +2286,94 @@ def Main():
                 (event.type == pygame.KEYDOWN and event.key == pygame.K_x):
                 sys.exit()
 
-            if event.type == pygame.MOUSEBUTTONDOWN:
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_f:
+                field.Leap(
+                    birthSelector.GetActiveValues(),
+                    deathSelector.GetActiveValues(),
+                    LeapExponent
+                )
+                detector.Reset()
+                history.Reset()
+                history.Record(field.Snapshot())
+                shown = history.generation
+
+            # Arrow keys pan the unbounded field, so scrubbing is on comma (or backspace) and period
+            # The generations ahead are kept until a new one is worked out
+            if event.type == pygame.KEYDOWN and paused and \
+                event.key in (pygame.K_COMMA, pygame.K_BACKSPACE, pygame.K_PERIOD):
+                target = shown + 1 if event.key == pygame.K_PERIOD else shown - 1
+                if history.first <= target <= history.generation:
+                    shown = target
+                    field.Restore(history.Get(shown))
+                    detector.Reset()
+                    pygame.display.set_caption(
+                        f"Game of Life - generation {shown} of {history.first} to {history.generation}"
+                    )
+
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_s:
+                field.SavePattern(
+                    savePath,
+                    birthSelector.GetActiveValues(),
+                    deathSelector.GetActiveValues()
+                )
+                pygame.display.set_caption(f"Game of Life - saved {savePath}")
+
+            # Panning and zooming leave the cells alone, only real edits start the history over
+            edited = False
+            if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
                 if randomizeButton.OnButton(event.pos):
                     field.Randomize()
+                    edited = True
                     
                 elif clearButton.OnButton(event.pos):
                     field.Clear()
+                    edited = True
                     
                 elif pauseButton.OnButton(event.pos):
                     paused = not paused
 
+                # Toggled by field.HandleEvent below
+                elif field.rect.collidepoint(event.pos):
+                    edited = True
+
             field.HandleEvent(event)
             birthSelector.HandleEvent(event)
             deathSelector.HandleEvent(event)
+
+            if edited:
+                detector.Reset()
+                history.Reset()
+                history.Record(field.Snapshot())
+                shown = history.generation
+
+        # A new rule can't repeat the old one's generations, but those are still worth rewinding to
+        newRule = (birthSelector.GetActiveValues(), deathSelector.GetActiveValues())
+        if newRule != rule:
+            rule = newRule
+            detector.Reset()
  
         currentTime = time()
         if not paused and currentTime - lastStageTime > TimePerStage:
             lastStageTime = currentTime
+
+            # Carrying on from a rewound generation replaces the old future
+            if shown < history.generation:
+                history.Truncate(shown)
             field.Progress(
                 birthSelector.GetActiveValues(),
                 deathSelector.GetActiveValues()
             )
+            caption = f"Game of Life - {field.activeCells} active cells"
+
+            history.Record(field.Snapshot())
+            shown = history.generation
+            period = detector.Observe(field)
+            if period is not None:
+                caption += " - still life" if period == 1 else f" - period {period} cycle"
+                if PauseOnCycle:
+                    paused = True
+                    detector.Reset()
+            pygame.display.set_caption(caption)
 
         ########################
         # Drawing
@@ -495,4 +2391,62 @@ def Main():
         pygame.display.update()
 
 if __name__ == "__main__":
-    Main()
+    parser = argparse.ArgumentParser(description="Conway's Game of Life")
+    parser.add_argument("--engine", default="sparse",
+        help="Engine to use, comma separated to benchmark several: " + ", ".join(list(Engines) + ["hashlife"]))
+    parser.add_argument("--benchmark", action="store_true", help="Run headless and report throughput")
+    parser.add_argument("--size", default="1024x1024", help="Field size for benchmarks, as HEIGHTxWIDTH")
+    parser.add_argument("--density", type=float, default=.5)
+    parser.add_argument("--rule", default="B3/S23")
+    parser.add_argument("--generations", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-memory", action="store_true", help="Skip the tracemalloc run")
+    parser.add_argument("--json", action="store_true", help="Print one JSON object per engine")
+    parser.add_argument("--census", metavar="PATH", help="Classify random soups into PATH (.csv or .jsonl)")
+    parser.add_argument("--soups", type=int, default=1000)
+    parser.add_argument("--max-generations", type=int, default=5000)
+    parser.add_argument("--processes", type=int, default=CORES)
+    parser.add_argument("--load", metavar="PATH", help="Start from an .rle or .mc pattern, using its rule")
+    parser.add_argument("--save", metavar="PATH", default="GameOfLife.rle",
+        help="Where the s key saves the field, .mc for macrocell and RLE otherwise")
+    args = parser.parse_args()
+
+    # hashlife has no field to draw or census, so it only runs in benchmarks
+    engines = args.engine.split(",")
+    for engine in engines:
+        if engine not in Engines and engine != "hashlife":
+            parser.error(f"unknown engine {engine}, pick from " + ", ".join(list(Engines) + ["hashlife"]))
+    if args.census and (len(engines) > 1 or engines[0] not in Engines):
+        parser.error("--census takes a single --engine, one of " + ", ".join(Engines))
+    if not args.benchmark and (len(engines) > 1 or engines[0] not in Engines):
+        parser.error("without --benchmark --engine has to be one of " + ", ".join(Engines))
+
+    if args.census:
+        height, width = (int(n) for n in args.size.lower().split("x"))
+        outcomes = Census(
+            args.census, args.soups, height, width, args.density, args.rule,
+            args.max_generations, args.engine, args.processes, args.seed
+        )
+        for outcome, count in sorted(outcomes.items()):
+            print(f"{outcome:>12}: {count}")
+        sys.exit()
+
+    if not args.benchmark:
+        Main(Engines[args.engine], args.load, args.save)
+        sys.exit()
+
+    height, width = (int(n) for n in args.size.lower().split("x"))
+    for engine in engines:
+        result = Benchmark(
+            engine, height, width, args.density, args.rule,
+            args.generations, args.seed, not args.no_memory
+        )
+        if args.json:
+            print(json.dumps(result))
+        else:
+            memory = "n/a" if result["peakMemory"] is None else f"{result['peakMemory'] / 2 ** 20:.1f} MiB"
+            print(
+                f"{engine:>10}: {result['generationsPerSecond']:10.2f} gen/s  "
+                f"{result['cellUpdatesPerSecond']:14.0f} cell updates/s  "
+                f"peak {memory}  population {result['population']}"
+            )
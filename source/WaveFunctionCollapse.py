@@ -33,15 +33,21 @@ in CollapseScene::update.
 Backtrcking is required. Rather than saving 
 the entire state of the grid at each step 
 (which would consume all of the RAM), only 
-the changes are tracked with a ChainMap so 
+the changes are tracked, each collapse keeps
+what the cells it changed used to be, so
 backtracking a step is as simple as 
-removing the last set of changes.
+putting the last set of changes back.
+
+Each cell's options are a bitmask of tiles,
+so narrowing a neighbor is an OR of what the
+cell allows on that side and an AND.
 """
 
 import pygame
+import argparse
 import numpy as np
 import random
-from time import time
+from time import time, perf_counter
 from copy import deepcopy
 from collections import ChainMap
 
@@ -860,134 +866,145 @@ def display_adjacency():
 class CollapseScene:
     BASE_COLOR = (100, 100, 100)
 
-    def __init__(self):
-        self.surface = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    # How many collapses can be undone
+    HISTORY_LENGTH = 20
+
+    def __init__(self, w=None, h=None, headless=False):
+        """
+        w and h are in tiles and default to filling the screen.
+        A headless scene never opens a window, for generating with generate
+        """
+        self.w = SCREEN_WIDTH // TILE_SIZE if w is None else w
+        self.h = SCREEN_HEIGHT // TILE_SIZE if h is None else h
+        self.surface = None if headless else pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
 
         self.tiles, self.weights = TileMaker().make()
         self.adj = AdjacencyMaker().make(self.tiles)
 
+        # Bit j of adj_masks[direction][i] is set when tile j can be on that side of tile i
+        self.adj_masks = [
+            [sum(1 << j for j in self.adj[i][direction]) for i in range(len(self.tiles))]
+            for direction in (LEFT, RIGHT, UP, DOWN)
+        ]
+        # What every tile in a domain allows on each side, OR-ed together.
+        # The same few domains come up over and over, so each is only worked out once
+        self.support_cache = [dict() for _ in (LEFT, RIGHT, UP, DOWN)]
+
+        # (neighbor, direction) of every cell, cells are y * w + x
+        self.neighbor_table = [
+            [(ny * self.w + nx, dire) for nx, ny, dire in self.neighbors(x, y)]
+            for y in range(self.h) for x in range(self.w)
+        ]
+
         self.update_timer = COLLAPSE_DELAY
 
         self.reset()
 
     def reset(self):
-        w = SCREEN_WIDTH // TILE_SIZE
-        h = SCREEN_HEIGHT // TILE_SIZE
-
-        all_tiles = set(range(len(self.tiles)))
-        base_map = {(x, y): deepcopy(all_tiles) for x in range(w) for y in range(h)}
-        self.chain = [base_map]
+        all_tiles = (1 << len(self.tiles)) - 1
+        # Every cell's options as a bitmask of tiles, and how many there are
+        self.domains = [all_tiles] * (self.w * self.h)
+        self.sizes = np.full(self.w * self.h, len(self.tiles), dtype=np.int32)
+        self.history = []
 
         #first choice, done manually to make sure its set up properly
-        fc_x = random.randint(0, w - 1)
-        fc_y = random.randint(0, h - 1)
-        fc_tile = random.choice(list(all_tiles))
-        self.chain[0][(fc_x, fc_y)] = deepcopy(all_tiles).difference({fc_tile})
-        self.chain = [{(fc_x, fc_y): {fc_tile}}] + self.chain
-        self.update_chainmap()
-
-        self.completed = dict()
+        fc_x = random.randint(0, self.w - 1)
+        fc_y = random.randint(0, self.h - 1)
+        fc_tile = random.randrange(len(self.tiles))
+        self.choose(fc_y * self.w + fc_x, fc_tile)
+
+    def choose(self, cell, tile):
+        """
+        Collapses cell to tile in a new history layer
+        Undoing the layer leaves every other option, so the same choice isn't made again
+        """
+        self.history.append({cell: self.domains[cell] & ~(1 << tile)})
+        self.domains[cell] = 1 << tile
+        self.sizes[cell] = 1
+        self.reduce_history()
+
+    def set_domain(self, cell, domain):
+        """
+        Changes a cell's options, remembering what they were for backtracking
+        """
+        self.history[-1].setdefault(cell, self.domains[cell])
+        self.domains[cell] = domain
+        self.sizes[cell] = domain.bit_count()
 
     def backtrack(self):
-        if len(self.chain) == 0:
+        if len(self.history) == 0:
             self.reset()
-        self.chain = self.chain[1:]
-        self.update_chainmap()
-
-    def update_chainmap(self):
-        self.chainmap = ChainMap(*self.chain)
-
-    def reduce_chainmap(self):
-        while len(self.chain) > 20:
-            removed = self.chain.pop()
-
-            self.completed.update(removed)
-
-    def grid_iter(self):
-        found = set()
-        for k, v in list(self.chainmap.items()) + list(self.completed.items()):
-            if k in found:
-                continue
-            found.add(k)
-
-            yield k, v
-
-    def grid_getter(self, x, y):
-        if (x, y) in self.chainmap:
-            return self.chainmap[(x, y)]
-        if (x, y) in self.completed:
-            return self.completed[(x, y)]
+        for cell, domain in self.history.pop().items():
+            self.domains[cell] = domain
+            self.sizes[cell] = domain.bit_count()
 
-        raise ValueError(f"({x}, {y}) not in maps")
+    def reduce_history(self):
+        # Past this the oldest collapses are final
+        while len(self.history) > CollapseScene.HISTORY_LENGTH:
+            self.history.pop(0)
 
     def draw(self):
         self.surface.fill(CollapseScene.BASE_COLOR)
 
-        for (x,y), tile_set in self.grid_iter():
-            if len(tile_set) == 0:
-                self.backtrack()
-                self.draw()
-                return
-
-            elif len(tile_set) == 1:
-                self.surface.blit(
-                    self.tiles[next(iter(tile_set))],
-                    (x * TILE_SIZE, y * TILE_SIZE)
-                )
-
-            # This tile is not fully collapsed so 
-            #   just draw nothing? The surface is
-            #   already filled with a blank color
-            else:
-                pass
+        if (self.sizes == 0).any():
+            self.backtrack()
+            self.draw()
+            return
+
+        # Cells that are not fully collapsed are left
+        #   blank, the surface is already filled
+        for cell in np.flatnonzero(self.sizes == 1):
+            y, x = divmod(int(cell), self.w)
+            self.surface.blit(
+                self.tiles[self.domains[cell].bit_length() - 1],
+                (x * TILE_SIZE, y * TILE_SIZE)
+            )
 
     def pick(self):
-        tiles_1d = []
-        for (x,y), tile_set in self.grid_iter():
-            tiles_1d.append((x, y, len(tile_set)))
+        """
+        A random cell out of the ones with the fewest options left, None if there is nothing to do
+        Still looks at every cell, but in one go
+        """
+        if (self.sizes == 0).any():
+            self.backtrack()
+            return None
 
-        random.shuffle(tiles_1d)
-        tiles_1d.sort(key=lambda x: x[2])
-        for tile in tiles_1d:
-            if tile[2] == 0:
-                # self.reset()
-                self.backtrack()
-                return None, None
+        open_cells = np.flatnonzero(self.sizes > 1)
+        if len(open_cells) == 0:
+            # Nothing to do, done!
+            return None
 
-            elif tile[2] == 1:
-                continue
-            else:
-                return tile[:2]
+        sizes = self.sizes[open_cells]
+        return int(random.choice(open_cells[sizes == sizes.min()]))
 
-        # Nothing to do, done!
-        return None, None
+    def done(self):
+        return bool((self.sizes == 1).all())
 
     def _weighted_choice(self, options):
         weights = [self.weights[t] for t in options]
         return random.choices(options, weights, k=1)[0]
 
-    def collapse(self, x, y):
-        options = self.grid_getter(x, y)
-
-        tile = self._weighted_choice(list(options))
-        self.chain[0][(x, y)] = deepcopy(options).difference({tile})
-        self.chain = [{(x, y): {tile}}] + self.chain
-        self.reduce_chainmap()
-        self.update_chainmap()
-
-    def propagate_helper(self, changed, trial, direction, nx, ny):
-        to_remove = set()
-        for trial_tile in trial:
-            for changed_tile in changed:
-                if trial_tile in self.adj[changed_tile][direction]:
-                    break
-            else:
-                to_remove.add(trial_tile)
-
-        self.chain[0][(nx, ny)] = trial.difference(to_remove)
-        self.update_chainmap()
-
-        return len(to_remove) > 0
+    def collapse(self, cell):
+        options = self.domains[cell]
+        tile = self._weighted_choice([t for t in range(len(self.tiles)) if options >> t & 1])
+        self.choose(cell, tile)
+
+    def supported(self, domain, direction):
+        """
+        Every tile that some tile in domain allows on that side of it
+        """
+        cache = self.support_cache[direction]
+        allowed = cache.get(domain)
+        if allowed is None:
+            masks = self.adj_masks[direction]
+            allowed = 0
+            remaining = domain
+            while remaining:
+                lowest = remaining & -remaining
+                allowed |= masks[lowest.bit_length() - 1]
+                remaining ^= lowest
+            cache[domain] = allowed
+        return allowed
 
     def neighbors(self, x, y):
         directions = [
@@ -997,43 +1014,58 @@ class CollapseScene:
             (0, 1, DOWN),
         ]
 
-        w = SCREEN_WIDTH // TILE_SIZE
-        h = SCREEN_HEIGHT // TILE_SIZE
-
         for dx, dy, dire in directions:
             nx = x + dx
             ny = y + dy
 
-            if not (0 <= nx < w) or not (0 <= ny < h):
+            if not (0 <= nx < self.w) or not (0 <= ny < self.h):
                 continue
 
             yield nx, ny, dire
 
-    def propagate(self, x, y):
-        changed = [(x, y)]
+    def propagate(self, cell):
+        changed = [cell]
 
         while len(changed) > 0:
-            cx, cy = changed.pop()
+            current = changed.pop()
+            domain = self.domains[current]
 
-            for nx, ny, dire in self.neighbors(cx, cy):
-                current_set = self.grid_getter(cx, cy)
-                neighbor_set = self.grid_getter(nx, ny)
-                if self.propagate_helper(current_set, neighbor_set, dire, nx, ny):
+            for neighbor, dire in self.neighbor_table[current]:
+                trial = self.domains[neighbor]
+                narrowed = trial & self.supported(domain, dire)
+                if narrowed != trial:
                     # A change was made to the neighbor
-                    changed.append((nx, ny))
+                    self.set_domain(neighbor, narrowed)
+                    if narrowed == 0:
+                        # Contradiction, this whole layer is getting backtracked anyway
+                        return
+                    changed.append(neighbor)
+
+    def step(self):
+        cell = self.pick()
+        if cell is None:
+            return
+
+        self.collapse(cell)
+        self.propagate(cell)
 
     def update(self, elapsed):
         self.update_timer -= elapsed
 
         while self.update_timer < 0:
             self.update_timer += COLLAPSE_DELAY
-
-            x, y = self.pick()
-            if x is None and y is None:
-                continue
-
-            self.collapse(x, y)
-            self.propagate(x, y)
+            self.step()
+
+    def generate(self):
+        """
+        Runs until every cell is collapsed, without drawing anything
+        Returns how many steps it took
+        """
+        steps = 0
+        while not self.done():
+            self.step()
+            steps += 1
+        return steps
 
     def run(self):
 
@@ -1061,6 +1093,19 @@ class CollapseScene:
             pygame.display.update()
 
 if __name__ == "__main__":
-    # display_tiles(True)
-    # display_adjacency()
-    CollapseScene().run()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Wave Function Collapse")
+    parser.add_argument("--benchmark", metavar="WxH", help="Generate a grid this many tiles big headless and time it")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    if args.benchmark:
+        random.seed(args.seed)
+        w, h = (int(n) for n in args.benchmark.lower().split("x"))
+        scene = CollapseScene(w, h, headless=True)
+        start = perf_counter()
+        steps = scene.generate()
+        print(f"{w}x{h}: {perf_counter() - start:.2f}s, {steps} steps")
+    else:
+        # display_tiles(True)
+        # display_adjacency()
+        CollapseScene().run()
\ No newline at end of file